@@ -7,7 +7,6 @@ from flask import Flask, render_template, request, redirect, url_for, session, j
 from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
 import os
-import sqlite3
 import logging
 import yaml
 from pathlib import Path
@@ -15,6 +14,7 @@ from functools import wraps
 from config import *
 from db_helper import DBHelper
 from heic_converter import is_heic_file, process_heic_upload, HEIC_SUPPORT
+from renditions import RenditionBuilder
 
 # 配置日志
 try:
@@ -57,6 +57,11 @@ app.config['UPLOAD_FOLDER'] = str(UPLOAD_FOLDER)
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
 db = DBHelper()
+rendition_builder = RenditionBuilder(
+    db, RENDITION_FOLDER, RENDITION_SIZES,
+    workers=RENDITION_WORKERS, quality=RENDITION_QUALITY, enabled=RENDITIONS_ENABLED,
+    ffmpeg=RENDITION_FFMPEG
+)
 
 
 @app.context_processor
@@ -67,23 +72,15 @@ def inject_app_root():
     }
 
 
-def trigger_reload():
-    """触发 viewer 重载"""
+def trigger_reload(zone_codes=None):
+    """
+    触发 viewer 重载
+    zone_codes: 受影响的区域代码列表，为空时整屏重载
+    """
     try:
-        from datetime import datetime, timezone, timedelta
-        beijing_tz = timezone(timedelta(hours=8))
-        beijing_time = datetime.now(beijing_tz).strftime('%Y-%m-%d %H:%M:%S')
-        
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE reload_signal 
-            SET need_reload = 1, updated_at = ? 
-            WHERE id = 1
-        """, (beijing_time,))
-        conn.commit()
-        conn.close()
-        logger.info(f"已触发重载信号 (北京时间: {beijing_time})")
+        version = db.signal_reload(zone_codes)
+        scope = ', '.join(sorted(set(zone_codes))) if zone_codes else '全部区域'
+        logger.info(f"已触发重载信号 v{version} ({scope})")
     except Exception as e:
         logger.error(f"触发重载信号失败: {e}", exc_info=True)
 
@@ -245,13 +242,21 @@ def api_delete_playlist(playlist_id):
 @login_required
 def api_activate_playlist(playlist_id):
     """激活播放列表"""
-    data = request.json
-    zone_code = data.get('zone_code')
+    data = request.json or {}
+    # 批量操作时可延后重载，由调用方最后统一调用 /api/reload
+    defer_reload = bool(data.get('defer_reload'))
     
     try:
+        # 以播放列表实际所属区域为准，不信任请求中的 zone_code
+        zone_code = db.get_zone_code_by_playlist(playlist_id)
+        if not zone_code:
+            return jsonify({'success': False, 'error': f'播放列表不存在: {playlist_id}'})
+        if data.get('zone_code') and data['zone_code'] != zone_code:
+            logger.warning(f"播放列表 {playlist_id} 属于区域 {zone_code}，忽略请求中的 zone={data['zone_code']}")
         db.set_active_playlist(zone_code, playlist_id)
-        trigger_reload()
-        logger.info(f"激活播放列表: id={playlist_id}, zone={zone_code}")
+        if not defer_reload:
+            trigger_reload([zone_code])
+        logger.info(f"激活播放列表: id={playlist_id}, zone={zone_code}, defer_reload={defer_reload}")
         return jsonify({'success': True})
     except Exception as e:
         logger.error(f"激活播放列表失败: {e}", exc_info=True)
@@ -269,6 +274,23 @@ def api_get_playlist_items(playlist_id):
         return jsonify({'success': False, 'error': str(e)})
 
 
+@app.route('/api/reload', methods=['POST'])
+@login_required
+def api_trigger_reload():
+    """
+    统一触发 viewer 重载（批量操作结束后调用）
+    zone_codes 为空时整屏重载
+    """
+    data = request.json or {}
+    zone_codes = [z for z in (data.get('zone_codes') or []) if z]
+    try:
+        trigger_reload(zone_codes or None)
+        return jsonify({'success': True, 'zone_codes': sorted(set(zone_codes))})
+    except Exception as e:
+        logger.error(f"触发重载失败: {e}", exc_info=True)
+        return jsonify({'success': False, 'error': str(e)})
+
+
 # ========== 播放项 API ==========
 @app.route('/api/item/add', methods=['POST'])
 @login_required
@@ -330,7 +352,8 @@ def api_set_item_first(item_id):
     """将播放项调整为首个播放"""
     try:
         db.set_item_first(item_id)
-        trigger_reload()
+        zone_code = db.get_zone_code_by_item(item_id)
+        trigger_reload([zone_code] if zone_code else None)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -403,6 +426,10 @@ def api_upload():
         
         if playlist_id:
             db.add_playlist_item(int(playlist_id), asset_id=asset_id, display_ms=int(display_ms))
+
+        # 后台生成各区域尺寸的缩小版 / 视频封面帧
+        if kind in ('image', 'video'):
+            rendition_builder.submit(asset_id, filepath, kind)
         
         return jsonify({'success': True, 'asset_id': asset_id, 'filename': filename})
     
@@ -432,7 +459,8 @@ def api_add_asset_by_path():
         # 判断文件类型
         ext = os.path.splitext(file_path)[1].lower().lstrip('.')
         
-        if ext in {'png', 'jpg', 'jpeg', 'gif'}:
+        # HEIC/HEIF 不转换：NAS 上的原文件由 viewer 的 HEIF 解码进程池直接显示
+        if ext in {'png', 'jpg', 'jpeg', 'gif', 'heic', 'heif'}:
             kind = 'image'
         elif ext in {'mp4', 'avi', 'mov', 'mkv'}:
             kind = 'video'
@@ -446,6 +474,8 @@ def api_add_asset_by_path():
         # 如果指定了播放列表，添加到播放列表
         if playlist_id:
             db.add_playlist_item(int(playlist_id), asset_id=asset_id, display_ms=int(display_ms))
+
+        rendition_builder.submit(asset_id, file_path, kind)
         
         logger.info(f"通过路径添加资源: {kind} - {file_path} (asset_id={asset_id})")
         
@@ -469,7 +499,9 @@ def api_update_asset_title(asset_id):
     title = data.get('title', '').strip()
     try:
         db.update_media_title(asset_id, title)
-        trigger_reload()
+        zone_codes = db.get_zone_codes_by_asset(asset_id)
+        if zone_codes:
+            trigger_reload(zone_codes)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
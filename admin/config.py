@@ -55,6 +55,21 @@ ALLOWED_EXTENSIONS = set(admin_config.get('allowed_extensions',
 max_size_mb = admin_config.get('max_file_size', 500)
 MAX_CONTENT_LENGTH = max_size_mb * 1024 * 1024
 
+# 图片预缩放 / 视频封面帧配置（目标尺寸按 1920x1080 屏幕的区域尺寸略向上取整）
+DEFAULT_RENDITION_SIZES = {
+    'left_16x9': [1280, 720],
+    'right_9x16': [405, 720],
+    'fullscreen': [1920, 1080],
+}
+rendition_config = _config.get('renditions', {}) or {}
+RENDITIONS_ENABLED = bool(rendition_config.get('enabled', True))
+RENDITION_FOLDER = get_absolute_path(rendition_config.get('dir', 'renditions'))
+RENDITION_SIZES = [tuple(size) for size in (rendition_config.get('sizes') or DEFAULT_RENDITION_SIZES).values()]
+RENDITION_WORKERS = max(1, int(rendition_config.get('workers', 2)))
+RENDITION_QUALITY = int(rendition_config.get('quality', 90))
+# 提取视频封面帧用的 ffmpeg（找不到时不生成封面帧）
+RENDITION_FFMPEG = rendition_config.get('ffmpeg', 'ffmpeg')
+
 # Flask 配置
 # 从配置文件读取或使用默认值（生产环境应该修改）
 SECRET_KEY = admin_config.get('secret_key', 'your-secret-key-change-in-production')
@@ -87,6 +102,7 @@ if __name__ == '__main__':
     print(f"配置目录: {CONFIG_DIR}")
     print(f"数据库路径: {DATABASE_PATH}")
     print(f"上传目录: {UPLOAD_FOLDER}")
+    print(f"预缩放目录: {RENDITION_FOLDER} ({'启用' if RENDITIONS_ENABLED else '停用'})")
     print(f"管理员: {ADMIN_USERNAME}")
     print(f"允许的文件类型: {ALLOWED_EXTENSIONS}")
     print(f"最大文件大小: {max_size_mb}MB")
@@ -63,6 +63,20 @@ class DBHelper:
             if 'original_name' not in asset_columns:
                 cursor.execute("ALTER TABLE media_asset ADD COLUMN original_name TEXT")
 
+            # 图片预缩放版本 / 视频封面帧
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS media_rendition (
+                  id              INTEGER PRIMARY KEY AUTOINCREMENT,
+                  asset_id        INTEGER NOT NULL REFERENCES media_asset(id) ON DELETE CASCADE,
+                  width           INTEGER NOT NULL,
+                  height          INTEGER NOT NULL,
+                  uri             TEXT NOT NULL,
+                  created_at      DATETIME NOT NULL DEFAULT (datetime('now')),
+                  UNIQUE (asset_id, width, height)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_rendition_asset ON media_rendition(asset_id)")
+
         # playlist_item 补充倒计时字段
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='playlist_item'")
         has_item_table = cursor.fetchone()
@@ -72,6 +86,24 @@ class DBHelper:
             if 'countdown_target' not in item_columns:
                 cursor.execute("ALTER TABLE playlist_item ADD COLUMN countdown_target TEXT")
 
+        # reload_signal 补充版本号（viewer 通过版本变化识别新的重载信号）
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='reload_signal'")
+        has_signal_table = cursor.fetchone()
+        if has_signal_table:
+            cursor.execute("PRAGMA table_info(reload_signal)")
+            signal_columns = [row[1] for row in cursor.fetchall()]
+            if 'version' not in signal_columns:
+                cursor.execute("ALTER TABLE reload_signal ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+            # 区域级重载日志
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS reload_zone (
+                  zone_code       TEXT PRIMARY KEY,
+                  version         INTEGER NOT NULL DEFAULT 0,
+                  updated_at      DATETIME NOT NULL DEFAULT (datetime('now'))
+                )
+            """)
+
         conn.commit()
         conn.close()
     
@@ -128,6 +160,79 @@ class DBHelper:
         finally:
             conn.close()
     
+    def get_zone_code_by_playlist(self, playlist_id: int) -> Optional[str]:
+        """获取播放列表所属区域代码"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT z.code FROM playlist p
+            JOIN zone z ON p.zone_id = z.id
+            WHERE p.id = ?
+        """, (playlist_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def get_zone_code_by_item(self, item_id: int) -> Optional[str]:
+        """获取播放项所属区域代码"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT z.code FROM playlist_item pi
+            JOIN playlist p ON pi.playlist_id = p.id
+            JOIN zone z ON p.zone_id = z.id
+            WHERE pi.id = ?
+        """, (item_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def get_zone_codes_by_asset(self, asset_id: int) -> List[str]:
+        """获取引用了指定资源的所有区域代码"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT z.code FROM playlist_item pi
+            JOIN playlist p ON pi.playlist_id = p.id
+            JOIN zone z ON p.zone_id = z.id
+            WHERE pi.asset_id = ?
+        """, (asset_id,))
+        rows = cursor.fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    # ========== 重载信号相关 ==========
+    def signal_reload(self, zone_codes: Optional[List[str]] = None) -> int:
+        """
+        写入重载信号并记录受影响的区域
+        zone_codes 为空时表示整屏重载（记为 '*'）
+        只记录区域、不记录播放列表：viewer 按区域整体重新绑定，每个区域同时只有一个活跃列表，
+        修改播放列表或播放项的调用方先解析出所属区域（get_zone_code_by_playlist / _by_item / _by_asset）
+        返回新的信号版本号
+        """
+        beijing_time = get_beijing_time()
+        codes = sorted(set(zone_codes)) if zone_codes else ['*']
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE reload_signal
+                SET need_reload = 1, version = version + 1, updated_at = ?
+                WHERE id = 1
+            """, (beijing_time,))
+            cursor.execute("SELECT version FROM reload_signal WHERE id = 1")
+            row = cursor.fetchone()
+            version = row[0] if row else 0
+            cursor.executemany("""
+                INSERT OR REPLACE INTO reload_zone (zone_code, version, updated_at)
+                VALUES (?, ?, ?)
+            """, [(code, version, beijing_time) for code in codes])
+            conn.commit()
+        finally:
+            conn.close()
+        return version
+
     # ========== 播放列表相关 ==========
     def get_playlists_by_zone(self, zone_code: str) -> List[Dict]:
         """获取指定区域的所有播放列表"""
@@ -323,6 +428,21 @@ class DBHelper:
         conn.close()
         return dict(row) if row else None
 
+    def add_renditions(self, asset_id: int, renditions: List[tuple]):
+        """
+        记录资源的预缩放版本（图片缩小版 / 视频封面帧）
+        renditions: [(宽, 高, 文件路径), ...]，同尺寸的旧记录被替换
+        """
+        beijing_time = get_beijing_time()
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO media_rendition (asset_id, width, height, uri, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(asset_id, w, h, f"file://{path}", beijing_time) for w, h, path in renditions])
+        conn.commit()
+        conn.close()
+
     def update_media_title(self, asset_id: int, title: str):
         """更新媒体资源的原始名称/title 字段"""
         conn = self.get_connection()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片预缩放版本和视频封面帧生成
+资源入库后在后台进程池中按各区域尺寸生成，记录到 media_rendition 表：
+- 图片：缩小版，viewer 选用能覆盖显示尺寸的最小版本，不必每次完整解码原图；
+  JPEG 用 draft 按 1/2、1/4、1/8 比例直接解码，其余格式由 resize 先整数倍 reduce 再精确缩放
+- 视频：第一帧可解码画面的 JPEG（封面帧），viewer 在视频缓冲完成前先显示封面
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from importlib.util import find_spec
+
+logger = logging.getLogger(__name__)
+
+# 动图逐帧播放，不生成缩小版
+SKIP_EXTENSIONS = {'gif'}
+EXIF_ORIENTATION = 0x0112
+POSTER_PATTERN = re.compile(r'^poster_(\d+)x(\d+)\.jpg$')
+FFMPEG_TIMEOUT = 60
+
+
+# ---- 子进程 ----
+
+def _init_worker():
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        pass
+
+
+def build_renditions(source, out_dir, sizes, quality=90):
+    """
+    子进程中执行：按各目标尺寸生成缩小版（保持原图比例、铺满目标尺寸，不放大）
+    输出目录中已有的版本直接复用
+
+    Args:
+        source: 原图路径
+        out_dir: 输出目录
+        sizes: 目标尺寸列表 [(宽, 高), ...]
+        quality: JPEG 质量
+
+    Returns:
+        list: [(宽, 高, 文件路径), ...]，原图不比任何目标尺寸大时为空
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as src:
+        if getattr(src, 'is_animated', False):
+            return []
+        sw, sh = src.size
+        # EXIF 方向为 5-8 时显示前需旋转 90 度，按旋转后的尺寸计算
+        rotated = src.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8)
+        if rotated:
+            sw, sh = sh, sw
+        alpha = 'A' in src.getbands() or 'transparency' in src.info
+        ext = 'png' if alpha else 'jpg'
+
+        wanted = {}
+        for w, h in sizes:
+            factor = max(w / sw, h / sh)
+            if factor >= 1.0:
+                continue
+            dims = (max(1, round(sw * factor)), max(1, round(sh * factor)))
+            wanted[dims] = os.path.join(out_dir, f"{dims[0]}x{dims[1]}.{ext}")
+        missing = {dims: path for dims, path in wanted.items() if not os.path.exists(path)}
+
+        if missing:
+            largest = max(missing, key=lambda d: d[0] * d[1])
+            # draft 只作用于 JPEG：解码结果不小于最大的目标尺寸
+            src.draft('RGB', (largest[1], largest[0]) if rotated else largest)
+            img = ImageOps.exif_transpose(src).convert('RGBA' if alpha else 'RGB')
+            os.makedirs(out_dir, exist_ok=True)
+            for dims, path in missing.items():
+                out = img.resize(dims, Image.LANCZOS, reducing_gap=3.0)
+                tmp = f"{path}.part"
+                if alpha:
+                    out.save(tmp, 'PNG')
+                else:
+                    out.save(tmp, 'JPEG', quality=quality, optimize=True)
+                os.replace(tmp, path)
+
+    return [(w, h, path) for (w, h), path in sorted(wanted.items())]
+
+
+def build_posters(source, out_dir, sizes, quality=90, ffmpeg='ffmpeg'):
+    """
+    子进程中执行：用 ffmpeg 取出视频第一帧可解码画面（按旋转元数据转正），
+    按各目标尺寸生成封面 JPEG（保持原比例、铺满目标尺寸；视频画面不够大时保持原尺寸）
+    输出目录中已有封面时直接复用
+
+    Returns:
+        list: [(宽, 高, 文件路径), ...]
+    """
+    from PIL import Image
+
+    existing = []
+    if os.path.isdir(out_dir):
+        for name in os.listdir(out_dir):
+            match = POSTER_PATTERN.match(name)
+            if match:
+                existing.append((int(match.group(1)), int(match.group(2)), os.path.join(out_dir, name)))
+    if existing:
+        return sorted(existing)
+
+    cmd = [
+        ffmpeg, '-v', 'error', '-nostdin', '-i', source,
+        '-map', '0:v:0', '-frames:v', '1', '-an', '-sn',
+        '-f', 'image2pipe', '-c:v', 'bmp', '-',
+    ]
+    result = subprocess.run(cmd, capture_output=True, timeout=FFMPEG_TIMEOUT)
+    if result.returncode != 0 or not result.stdout:
+        error = result.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise RuntimeError(f"ffmpeg 取帧失败: {error[-1] if error else result.returncode}")
+
+    with Image.open(io.BytesIO(result.stdout)) as frame:
+        img = frame.convert('RGB')
+    sw, sh = img.size
+    wanted = {}
+    for w, h in sizes:
+        factor = min(1.0, max(w / sw, h / sh))
+        dims = (max(1, round(sw * factor)), max(1, round(sh * factor)))
+        wanted[dims] = os.path.join(out_dir, f"poster_{dims[0]}x{dims[1]}.jpg")
+
+    os.makedirs(out_dir, exist_ok=True)
+    for dims, path in wanted.items():
+        out = img if dims == img.size else img.resize(dims, Image.LANCZOS, reducing_gap=3.0)
+        tmp = f"{path}.part"
+        out.save(tmp, 'JPEG', quality=quality, optimize=True)
+        os.replace(tmp, path)
+    return [(w, h, path) for (w, h), path in sorted(wanted.items())]
+
+
+# ---- 管理后台进程 ----
+
+class RenditionBuilder:
+    """资源入库后在后台生成图片预缩放版本 / 视频封面帧并写入数据库"""
+
+    def __init__(self, db, out_dir, sizes, workers=2, quality=90, enabled=True, ffmpeg='ffmpeg'):
+        self.db = db
+        self.out_dir = str(out_dir)
+        self.sizes = [(int(w), int(h)) for w, h in sizes]
+        self.workers = max(1, int(workers))
+        self.quality = int(quality)
+        self.enabled = bool(enabled) and bool(self.sizes)
+        self.ffmpeg = shutil.which(ffmpeg) if ffmpeg else None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._unavailable_logged = False
+        self._ffmpeg_logged = False
+
+    def submit(self, asset_id, path, kind='image'):
+        """
+        提交生成任务（不阻塞请求），完成后在进程池的结果线程中写入数据库
+        kind 为 image 时生成预缩放版本，为 video 时生成封面帧
+
+        Returns:
+            bool: 是否已提交
+        """
+        if not self.enabled:
+            return False
+        if kind == 'image':
+            if os.path.splitext(path)[1].lstrip('.').lower() in SKIP_EXTENSIONS:
+                return False
+            job = (build_renditions, self.quality)
+        elif kind == 'video':
+            if not self.ffmpeg:
+                if not self._ffmpeg_logged:
+                    self._ffmpeg_logged = True
+                    logger.warning("未找到 ffmpeg，不生成视频封面帧")
+                return False
+            job = (build_posters, self.quality, self.ffmpeg)
+        else:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            logger.warning(f"文件不可访问，跳过生成: {path} ({e})")
+            return False
+
+        out_dir = self._output_dir(path, st)
+        executor = self._get_executor()
+        if executor is None:
+            return False
+        func, *options = job
+        try:
+            future = executor.submit(func, path, out_dir, self.sizes, *options)
+        except BrokenProcessPool:
+            # 子进程异常退出（例如解码库崩溃）：重建进程池
+            self._reset_executor(executor)
+            executor = self._get_executor()
+            if executor is None:
+                return False
+            future = executor.submit(func, path, out_dir, self.sizes, *options)
+        future.add_done_callback(lambda f: self._on_done(asset_id, path, kind, executor, f))
+        return True
+
+    def _output_dir(self, path, st):
+        """
+        按源文件路径、大小和修改时间确定输出目录
+        schedule 每天重新登记同一文件时复用已生成的版本，文件被替换后重新生成
+        """
+        digest = hashlib.sha1(f"{path}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8')).hexdigest()
+        return os.path.join(self.out_dir, digest[:2], digest)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if find_spec('PIL') is None:
+                    if not self._unavailable_logged:
+                        self._unavailable_logged = True
+                        logger.warning("未安装 Pillow，不生成图片预缩放版本和视频封面帧")
+                    return None
+                # spawn：不 fork 正在处理请求的多线程进程
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+                logger.info(f"预缩放/封面帧进程池: {self.workers} 个进程, 输出目录 {self.out_dir}")
+            return self._executor
+
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def _on_done(self, asset_id, path, kind, executor, future):
+        label = '封面帧' if kind == 'video' else '预缩放版本'
+        try:
+            renditions = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_executor(executor)
+            logger.error(f"生成{label}失败: {path} ({e})")
+            return
+        if not renditions:
+            logger.debug(f"图片不大于目标尺寸，无需预缩放: {path}")
+            return
+        try:
+            self.db.add_renditions(asset_id, renditions)
+        except Exception as e:
+            logger.error(f"记录{label}失败: asset_id={asset_id} ({e})", exc_info=True)
+            return
+        sizes = ', '.join(f"{w}x{h}" for w, h, _ in renditions)
+        logger.info(f"{label}已生成: {path} (asset_id={asset_id}) -> {sizes}")
+        # 入库请求已触发过重载，此时 viewer 的快照中还没有这些版本：重载引用该资源的区域
+        try:
+            zone_codes = self.db.get_zone_codes_by_asset(asset_id)
+            if zone_codes:
+                version = self.db.signal_reload(zone_codes)
+                logger.info(f"已触发 viewer 重载(version={version}): {', '.join(sorted(zone_codes))}")
+        except Exception as e:
+            logger.error(f"{label}生成后触发重载失败: asset_id={asset_id} ({e})", exc_info=True)
@@ -124,10 +124,13 @@ class AdminAPIClient:
             logger.error(f"添加资源异常: {str(e)}")
             return False
     
-    def activate_playlist(self, playlist_id, zone_code):
+    def activate_playlist(self, playlist_id, zone_code, defer_reload=False):
         """
         激活播放列表
         
+        Args:
+            defer_reload: 是否延后 viewer 重载（批量激活时最后调用 trigger_reload 统一刷新）
+        
         Returns:
             bool: 是否成功
         """
@@ -137,7 +140,7 @@ class AdminAPIClient:
         
         try:
             url = f"{self.api_host}/api/playlist/{playlist_id}/activate"
-            data = {'zone_code': zone_code}
+            data = {'zone_code': zone_code, 'defer_reload': defer_reload}
             
             logger.info(f"激活播放列表: ID={playlist_id}, zone={zone_code}")
             response = self.session.post(url, json=data)
@@ -154,3 +157,37 @@ class AdminAPIClient:
         except Exception as e:
             logger.error(f"激活播放列表异常: {str(e)}")
             return False
+    
+    def trigger_reload(self, zone_codes=None):
+        """
+        触发 viewer 重载
+        
+        Args:
+            zone_codes: 需要刷新的区域代码列表，为空时整屏刷新
+        
+        Returns:
+            bool: 是否成功
+        """
+        if not self._logged_in:
+            if not self.login():
+                raise Exception("未登录")
+        
+        try:
+            url = f"{self.api_host}/api/reload"
+            data = {'zone_codes': list(zone_codes or [])}
+            
+            logger.info(f"触发 viewer 重载: {data['zone_codes'] or '全部区域'}")
+            response = self.session.post(url, json=data)
+            result = response.json()
+            
+            if result.get('success'):
+                logger.info("重载信号已发送")
+                return True
+            else:
+                error = result.get('error', 'Unknown error')
+                logger.error(f"触发重载失败: {error}")
+                return False
+                
+        except Exception as e:
+            logger.error(f"触发重载异常: {str(e)}")
+            return False
@@ -0,0 +1,227 @@
+"""
+本地媒体镜像模块
+生成播放列表后把选中的 NAS 文件复制到本机磁盘（并发数有限，复制后校验），
+viewer 播放时优先读取镜像，NAS 抖动或挂载断开时不影响播放
+"""
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+CHUNK_SIZE = 1024 * 1024
+
+
+def mirror_path(mirror_dir, source_path):
+    """
+    源文件在镜像目录中的位置（按源路径哈希分布，保留扩展名）
+    viewer/media_mirror.py 中的同名函数须与此保持一致
+    """
+    digest = hashlib.sha1(source_path.encode('utf-8')).hexdigest()
+    ext = os.path.splitext(source_path)[1].lower()
+    return os.path.join(mirror_dir, digest[:2], digest + ext)
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class MediaMirror:
+    """本地媒体镜像"""
+
+    def __init__(self, config):
+        mirror_config = config.get('mirror') or {}
+        self.enabled = bool(mirror_config.get('enabled', False))
+        mirror_dir = mirror_config.get('dir', 'media_mirror')
+        if not os.path.isabs(mirror_dir):
+            # 相对路径相对于 config 目录（与 viewer 一致）
+            config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
+            mirror_dir = os.path.join(config_dir, mirror_dir)
+        self.mirror_dir = os.path.abspath(mirror_dir)
+        self.max_bytes = int(float(mirror_config.get('max_gb', 20)) * 1024 ** 3)
+        self.workers = max(1, int(mirror_config.get('workers', 2)))
+        self.horizon_days = max(0, int(mirror_config.get('horizon_days', 2)))
+        self.manifest_path = os.path.join(self.mirror_dir, MANIFEST_NAME)
+
+    def sync(self, paths, target_date):
+        """
+        把播放列表用到的文件同步到镜像目录，并按计划范围和容量淘汰旧文件
+
+        Args:
+            paths: 源文件路径列表（挂载后的本地路径）
+            target_date: 播放列表日期 (YYYY-MM-DD)
+
+        Returns:
+            dict: 同步统计
+        """
+        os.makedirs(self.mirror_dir, exist_ok=True)
+        manifest = self._load_manifest()
+        paths = list(dict.fromkeys(paths))
+        keep = set(paths)
+        stats = {'copied': 0, 'reused': 0, 'failed': 0, 'evicted': 0, 'bytes_copied': 0}
+
+        # 先淘汰超出计划范围的文件，为本次复制腾出空间
+        stats['evicted'] += self._evict_expired(manifest, keep, target_date)
+
+        logger.info(f"同步 {len(paths)} 个文件到本地镜像: {self.mirror_dir}（并发 {self.workers}）")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            outcomes = pool.map(self._mirror_one, paths, [manifest.get(p) for p in paths])
+            for source, (status, entry) in zip(paths, outcomes):
+                stats[status] += 1
+                if entry is None:
+                    manifest.pop(source, None)
+                    continue
+                if status == 'copied':
+                    stats['bytes_copied'] += entry['size']
+                entry['last_scheduled'] = max(entry.get('last_scheduled', ''), target_date)
+                manifest[source] = entry
+
+        stats['evicted'] += self._evict_over_budget(manifest, keep)
+        self._remove_orphans(manifest)
+        self._save_manifest(manifest)
+        stats['total_bytes'] = sum(e['size'] for e in manifest.values())
+        logger.info(
+            f"镜像同步完成: 复制 {stats['copied']}, 复用 {stats['reused']}, 失败 {stats['failed']}, "
+            f"淘汰 {stats['evicted']}, 占用 {stats['total_bytes'] / 1024 ** 2:.1f} MB"
+        )
+        return stats
+
+    def _mirror_one(self, source, entry):
+        """
+        复制单个文件（在线程池中执行）
+
+        Returns:
+            tuple: (状态, 清单条目)；条目为 None 表示镜像中不再保留该文件
+        """
+        local = mirror_path(self.mirror_dir, source)
+        try:
+            st = os.stat(source)
+        except OSError as e:
+            if entry and os.path.isfile(local):
+                # NAS 暂不可用：保留已有镜像
+                logger.warning(f"源文件不可访问，沿用镜像: {source} ({e})")
+                return 'reused', entry
+            logger.error(f"源文件不可访问: {source} ({e})")
+            return 'failed', None
+
+        if (entry and entry.get('size') == st.st_size and entry.get('mtime') == st.st_mtime
+                and os.path.isfile(local) and os.path.getsize(local) == st.st_size):
+            return 'reused', entry
+
+        tmp = f"{local}.part"
+        try:
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            h = hashlib.sha256()
+            with open(source, 'rb') as src, open(tmp, 'wb') as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    h.update(chunk)
+                    dst.write(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+            checksum = h.hexdigest()
+
+            # 校验：复制期间源文件未变化，且落盘内容与读取内容一致
+            after = os.stat(source)
+            if (after.st_size, after.st_mtime) != (st.st_size, st.st_mtime):
+                raise IOError("复制期间源文件被修改")
+            if os.path.getsize(tmp) != st.st_size or _sha256_file(tmp) != checksum:
+                raise IOError("镜像文件校验失败")
+            os.replace(tmp, local)
+        except Exception as e:
+            logger.error(f"镜像复制失败: {source} ({e})")
+            for path in (tmp, local):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return 'failed', None
+
+        return 'copied', {
+            'local': os.path.relpath(local, self.mirror_dir),
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'sha256': checksum,
+            'last_scheduled': entry.get('last_scheduled', '') if entry else '',
+        }
+
+    def _evict_expired(self, manifest, keep, target_date):
+        """淘汰最近一次排期早于计划范围的文件"""
+        cutoff = (datetime.strptime(target_date, '%Y-%m-%d') - timedelta(days=self.horizon_days)).strftime('%Y-%m-%d')
+        expired = [
+            source for source, entry in manifest.items()
+            if source not in keep and entry.get('last_scheduled', '') < cutoff
+        ]
+        for source in expired:
+            self._remove(manifest, source)
+        return len(expired)
+
+    def _evict_over_budget(self, manifest, keep):
+        """超出容量时按最近排期从旧到新淘汰（本次用到的文件不淘汰）"""
+        total = sum(e['size'] for e in manifest.values())
+        if total <= self.max_bytes:
+            return 0
+        candidates = sorted(
+            (s for s in manifest if s not in keep),
+            key=lambda s: manifest[s].get('last_scheduled', '')
+        )
+        evicted = 0
+        for source in candidates:
+            if total <= self.max_bytes:
+                break
+            total -= manifest[source]['size']
+            self._remove(manifest, source)
+            evicted += 1
+        if total > self.max_bytes:
+            logger.warning(
+                f"本次播放列表的文件共 {total / 1024 ** 3:.1f} GB，超出镜像容量 {self.max_bytes / 1024 ** 3:.1f} GB"
+            )
+        return evicted
+
+    def _remove_orphans(self, manifest):
+        """删除清单以外的文件（中断残留的 .part 等）"""
+        known = {os.path.join(self.mirror_dir, e['local']) for e in manifest.values()}
+        known.add(self.manifest_path)
+        removed = 0
+        for root, dirs, files in os.walk(self.mirror_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if path not in known:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+    def _remove(self, manifest, source):
+        entry = manifest.pop(source)
+        try:
+            os.remove(os.path.join(self.mirror_dir, entry['local']))
+        except OSError:
+            pass
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"镜像清单无法读取，重新建立: {e}")
+            return {}
+
+    def _save_manifest(self, manifest):
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
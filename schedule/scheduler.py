@@ -7,6 +7,7 @@ from datetime import datetime
 from mount_manager import MountManager
 from media_collector import MediaCollector
 from api_client import AdminAPIClient
+from media_mirror import MediaMirror
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,7 @@ class PlaylistScheduler:
         self.mount_manager = MountManager(config)
         self.media_collector = MediaCollector(config)
         self.api_client = AdminAPIClient(config)
+        self.media_mirror = MediaMirror(config)
         
         # 配置参数
         self.target_zones = self.schedule_config['target_zones']
@@ -111,11 +113,35 @@ class PlaylistScheduler:
             
             logger.info(f"播放列表计划生成完成，共创建 {len(result['playlists'])} 个播放列表")
             
+            # 步骤 4: 复制到本地镜像（viewer 优先读取镜像，不再每次经 SMB 读取）
+            if self.media_mirror.enabled:
+                logger.info("步骤 4: 同步本地镜像")
+                files = [f for p in result['playlists'] for f in p.get('files', [])]
+                try:
+                    result['mirror'] = self.media_mirror.sync(files, target_date)
+                except Exception as e:
+                    error_msg = f"同步本地镜像失败: {str(e)}"
+                    logger.error(error_msg, exc_info=True)
+                    result['errors'].append(error_msg)
+            
         except Exception as e:
             error_msg = f"生成计划失败: {str(e)}"
             logger.error(error_msg, exc_info=True)
             result['errors'].append(error_msg)
         
+        # 统一触发一次 viewer 重载，避免逐个激活时反复刷新
+        activated_zones = sorted({
+            p['zone_code'] for p in result['playlists'] if p.get('activated')
+        })
+        if activated_zones:
+            logger.info(f"触发 viewer 重载: {', '.join(activated_zones)}")
+            try:
+                self.api_client.trigger_reload(activated_zones)
+            except Exception as e:
+                error_msg = f"触发 viewer 重载失败: {str(e)}"
+                logger.error(error_msg)
+                result['errors'].append(error_msg)
+        
         return result
     
     def _create_image_playlist(self, zone_code, date, index, mounted_paths):
@@ -149,15 +175,16 @@ class PlaylistScheduler:
             raise Exception("创建播放列表失败")
         
         # 添加图片到播放列表
-        success_count = 0
+        added = []
         for image_path in images:
             if self.api_client.add_asset_to_playlist(playlist_id, image_path, display_ms=5000):
-                success_count += 1
+                added.append(image_path)
+        success_count = len(added)
         
         logger.info(f"成功添加 {success_count}/{len(images)} 个图片")
         
-        # 激活播放列表
-        activated = self.api_client.activate_playlist(playlist_id, zone_code)
+        # 激活播放列表（延后重载，全部生成后统一刷新）
+        activated = self.api_client.activate_playlist(playlist_id, zone_code, defer_reload=True)
         
         return {
             'type': 'image',
@@ -165,7 +192,8 @@ class PlaylistScheduler:
             'playlist_id': playlist_id,
             'name': playlist_name,
             'item_count': success_count,
-            'activated': activated
+            'activated': activated,
+            'files': added
         }
     
     def _create_video_playlist(self, zone_code, date, index, mounted_paths):
@@ -199,16 +227,17 @@ class PlaylistScheduler:
             raise Exception("创建播放列表失败")
         
         # 添加视频到播放列表
-        success_count = 0
+        added = []
         for video_path in videos:
             # 视频不需要 display_ms，由视频长度决定
             if self.api_client.add_asset_to_playlist(playlist_id, video_path):
-                success_count += 1
+                added.append(video_path)
+        success_count = len(added)
         
         logger.info(f"成功添加 {success_count}/{len(videos)} 个视频")
         
-        # 激活播放列表
-        activated = self.api_client.activate_playlist(playlist_id, zone_code)
+        # 激活播放列表（延后重载，全部生成后统一刷新）
+        activated = self.api_client.activate_playlist(playlist_id, zone_code, defer_reload=True)
         
         return {
             'type': 'video',
@@ -216,5 +245,6 @@ class PlaylistScheduler:
             'playlist_id': playlist_id,
             'name': playlist_name,
             'item_count': success_count,
-            'activated': activated
+            'activated': activated,
+            'files': added
         }
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MiddleStage 区域重新绑定：区域被清空后旧播放列表和待执行的切换不应残留
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "viewer"))
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from db_manager import ScreenSnapshot, ZoneSnapshot  # noqa: E402
+from widgets.middle_stage import MiddleStage  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def _snapshot(zone_code, items, digest, fullscreen=False):
+    zone = ZoneSnapshot(zone_code, 1, "测试", "loop", tuple(items), digest)
+    return ScreenSnapshot(zone_code if fullscreen else None, {zone_code: zone}, "")
+
+
+TEXT_ITEM = {"id": 1, "kind": "text", "text": "旧内容", "display_ms": 5000}
+INVALID_ITEM = {"id": 2, "kind": "image", "uri": None, "display_ms": 5000}
+
+
+def test_rebind_to_no_valid_items_drops_playlist(app):
+    stage = MiddleStage()
+    stage.load_snapshot(_snapshot("left_16x9", [TEXT_ITEM], "a"))
+    assert stage.left_16x9._mixed_playlist
+    assert stage.clock.pending() == 1
+
+    stage.load_snapshot(_snapshot("left_16x9", [INVALID_ITEM], "b"))
+    assert stage.left_16x9._mixed_playlist == []
+    assert stage.clock.pending() == 0
+
+
+def test_fullscreen_zone_emptied_drops_playlist(app):
+    stage = MiddleStage()
+    stage.load_snapshot(_snapshot("left_16x9", [TEXT_ITEM], "a", fullscreen=True))
+    assert stage.fullscreen_frame._mixed_playlist
+    assert stage.clock.pending() == 1
+
+    stage.load_snapshot(_snapshot("left_16x9", [], "b", fullscreen=True))
+    assert stage.fullscreen_frame._mixed_playlist == []
+    assert stage.clock.pending() == 0
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+viewer 性能基准
+在 QT_QPA_PLATFORM=offscreen 下用生成的数据库和合成图片/视频运行 MultiZoneViewer，测量：
+- load_content() 延迟（整屏重绑 / 内容未变化两种情况）
+- 各区域尺寸下每次切换的图片解码+缩放耗时
+- 跑马灯每秒占用的 CPU 时间
+- 峰值常驻内存
+结果输出为 JSON，便于不同版本之间对比
+
+用法:
+    python benchmark.py --out bench.json
+    python benchmark.py --images 40 --videos 4 --marquee-seconds 10
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# 必须在导入 PyQt5 之前设置
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEventLoop, QSize, QTimer, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt5.QtGui import QColor, QImage, QLinearGradient, QPainter, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+# 结果 JSON 独占标准输出，viewer 和初始化脚本的打印信息改到标准错误
+with contextlib.redirect_stdout(sys.stderr):
+    from db_manager import MediaDBManager
+    from init_db import init_database
+    from main import MultiZoneViewer
+    from widgets.image_loader import decode_image
+
+# 结果格式版本，字段含义变化时递增
+BENCH_FORMAT = 1
+
+# 合成图片尺寸：相机原图 / 横屏 / 竖屏
+IMAGE_SIZES = [(4032, 3024), (1920, 1080), (1080, 1920)]
+
+# 放入图片/视频的区域
+MIXED_ZONES = ["left_16x9", "right_9x16"]
+TEXT_ZONES = ["extra_top", "extra_bottom", "bottom_cell_1", "bottom_cell_2", "bottom_cell_3", "bottom_strip"]
+
+
+def summarize(samples_ms):
+    """统计一组耗时（毫秒）"""
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "count": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(p95, 3),
+        "max_ms": round(ordered[-1], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+    }
+
+
+def peak_rss_kb() -> int:
+    """进程峰值常驻内存（KB）"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回 KB
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_events(ms: int):
+    """运行事件循环 ms 毫秒"""
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec_()
+
+
+def wait_for(signal, timeout_ms: int) -> bool:
+    """等待信号触发，超时返回 False"""
+    loop = QEventLoop()
+    fired = []
+    handler = lambda *_: (fired.append(True), loop.quit())
+    signal.connect(handler)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    loop.exec_()
+    signal.disconnect(handler)
+    return bool(fired)
+
+
+def make_images(corpus_dir: str, count: int):
+    """生成带渐变和细节的 JPEG，避免过于容易压缩"""
+    paths = []
+    for i in range(count):
+        w, h = IMAGE_SIZES[i % len(IMAGE_SIZES)]
+        img = QImage(w, h, QImage.Format_RGB32)
+        p = QPainter(img)
+        grad = QLinearGradient(0, 0, w, h)
+        grad.setColorAt(0, QColor.fromHsv((i * 37) % 360, 200, 230))
+        grad.setColorAt(1, QColor.fromHsv((i * 37 + 180) % 360, 160, 90))
+        p.fillRect(0, 0, w, h, grad)
+        p.setPen(QColor(255, 255, 255))
+        step = max(8, w // 120)
+        for x in range(0, w, step):
+            p.drawLine(x, 0, w - x, h)
+        p.end()
+        path = os.path.join(corpus_dir, f"image_{i:03d}_{w}x{h}.jpg")
+        img.save(path, "JPG", 85)
+        paths.append(path)
+    return paths
+
+
+def make_videos(corpus_dir: str, count: int):
+    """用 ffmpeg 生成短测试视频；没有 ffmpeg 时返回空列表"""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg or count <= 0:
+        return []
+    paths = []
+    for i in range(count):
+        path = os.path.join(corpus_dir, f"video_{i:03d}.mp4")
+        cmd = [
+            ffmpeg, "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", "testsrc=duration=3:size=1280x720:rate=25",
+            "-pix_fmt", "yuv420p", path,
+        ]
+        if subprocess.run(cmd).returncode == 0:
+            paths.append(path)
+    return paths
+
+
+def build_database(db_path: str, images, videos, texts_per_zone: int):
+    """生成数据库：图片/视频分配到混合区域，文字区域填入文字播放项"""
+    init_database(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        zone_ids = dict(conn.execute("SELECT code, id FROM zone").fetchall())
+
+        def add_playlist(zone_code):
+            cur = conn.execute(
+                "INSERT INTO playlist (zone_id, name, is_active) VALUES (?, ?, 1)",
+                (zone_ids[zone_code], f"bench_{zone_code}"),
+            )
+            return cur.lastrowid
+
+        def add_asset(kind, uri):
+            return conn.execute(
+                "INSERT INTO media_asset (kind, uri) VALUES (?, ?)", (kind, uri)
+            ).lastrowid
+
+        for n, zone_code in enumerate(MIXED_ZONES):
+            playlist_id = add_playlist(zone_code)
+            assets = [("image", p) for p in images[n::len(MIXED_ZONES)]]
+            assets += [("video", p) for p in videos[n::len(MIXED_ZONES)]]
+            for order, (kind, uri) in enumerate(assets):
+                conn.execute(
+                    "INSERT INTO playlist_item (playlist_id, asset_id, play_order, display_ms) VALUES (?, ?, ?, ?)",
+                    (playlist_id, add_asset(kind, uri), order, 5000),
+                )
+
+        for zone_code in ["top_marquee"] + TEXT_ZONES:
+            playlist_id = add_playlist(zone_code)
+            for order in range(texts_per_zone):
+                conn.execute(
+                    "INSERT INTO playlist_item (playlist_id, text_inline, play_order, display_ms) VALUES (?, ?, ?, ?)",
+                    (playlist_id, f"{zone_code} 基准测试文字 {order} - 多区域媒体显示系统", order, 5000),
+                )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def bench_load_content(viewer, repeats: int):
+    """load_content() 到快照应用完成的延迟"""
+    loader = viewer.snapshot_loader
+    full, unchanged, query = [], [], []
+    for _ in range(repeats):
+        # 整屏重绑：清空摘要，所有区域都会重新绑定
+        viewer._zone_digests = {}
+        viewer.stage._zone_digests = {}
+        t0 = time.perf_counter()
+        viewer.load_content()
+        if not wait_for(loader.snapshot_loaded, 10000):
+            raise RuntimeError("load_content 超时")
+        full.append((time.perf_counter() - t0) * 1000)
+
+        # 内容未变化：只读取和比较摘要
+        t0 = time.perf_counter()
+        viewer.load_content()
+        if not wait_for(loader.snapshot_loaded, 10000):
+            raise RuntimeError("load_content 超时")
+        unchanged.append((time.perf_counter() - t0) * 1000)
+
+        # 数据库查询本身（GUI 线程外执行的部分）
+        t0 = time.perf_counter()
+        viewer.db_manager.get_screen_snapshot()
+        query.append((time.perf_counter() - t0) * 1000)
+        run_events(50)
+    return {
+        "full_rebind": summarize(full),
+        "unchanged": summarize(unchanged),
+        "snapshot_query": summarize(query),
+    }
+
+
+def zone_sizes(viewer):
+    """各区域的图片目标尺寸"""
+    stage = viewer.stage
+    area = stage.rect().adjusted(6, 6, -6, -6)
+    sizes = {
+        "left_16x9": stage.left_16x9._image_target_size(),
+        "right_9x16": stage.right_9x16._image_target_size(),
+        "bottom_cell": stage.bottom_cells[0]._image_target_size(),
+        "fullscreen": QSize(max(1, area.width() - 10), max(1, area.height() - 10)),
+    }
+    return sizes
+
+
+def bench_decode(viewer, images, repeats: int):
+    """每次切换的解码+缩放（线程池中的工作）和转换为 QPixmap（GUI 线程中的工作）"""
+    results = {}
+    for zone, size in zone_sizes(viewer).items():
+        decode, convert = [], []
+        for _ in range(repeats):
+            for path in images:
+                t0 = time.perf_counter()
+                img, error = decode_image(path, size, cover=True)
+                t1 = time.perf_counter()
+                if error:
+                    continue
+                QPixmap.fromImage(img)
+                t2 = time.perf_counter()
+                decode.append((t1 - t0) * 1000)
+                convert.append((t2 - t1) * 1000)
+        results[zone] = {
+            "target": [size.width(), size.height()],
+            "decode_scale": summarize(decode),
+            "to_pixmap": summarize(convert),
+        }
+    return results
+
+
+def bench_marquee(viewer, seconds: float):
+    """跑马灯每秒 CPU：显示跑马灯时的 CPU 减去隐藏跑马灯时的基线"""
+    stage = viewer.stage
+    # 中部只显示静态文字，排除图片/视频切换的干扰
+    stage._stop_all_frames()
+    for frame in [stage.left_16x9, stage.right_9x16]:
+        stage._clear_mixed_playlist(frame)
+    stage.bind_demo()
+    run_events(200)
+
+    def measure(visible: bool):
+        viewer.marquee.setVisible(visible)
+        run_events(200)
+        c0, t0 = cpu_seconds(), time.perf_counter()
+        run_events(int(seconds * 1000))
+        return (cpu_seconds() - c0) / (time.perf_counter() - t0) * 1000
+
+    baseline = measure(False)
+    running = measure(True)
+    return {
+        "seconds": seconds,
+        "interval_ms": viewer.marquee._interval,
+        "cpu_ms_per_s_baseline": round(baseline, 3),
+        "cpu_ms_per_s_running": round(running, 3),
+        "cpu_ms_per_s": round(max(0.0, running - baseline), 3),
+    }
+
+
+def run(args):
+    """运行全部测量，返回结果报告"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="viewer-bench-")
+    try:
+        return _run(app, args, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run(app, args, workdir):
+    corpus_dir = os.path.join(workdir, "corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+    db_path = os.path.join(workdir, "media_display.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    rss = {"start_kb": peak_rss_kb()}
+    t0 = time.perf_counter()
+    images = make_images(corpus_dir, args.images)
+    videos = make_videos(corpus_dir, args.videos)
+    build_database(db_path, images, videos, args.texts)
+    setup_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    viewer = MultiZoneViewer(MediaDBManager(db_path), db_path)
+    viewer.resize(args.width, args.height)
+    viewer.show()
+    if viewer.snapshot_loader is None:
+        raise RuntimeError("未能创建快照加载器")
+    wait_for(viewer.snapshot_loader.snapshot_loaded, 10000)
+    startup_ms = (time.perf_counter() - t0) * 1000
+    run_events(500)
+    rss["after_startup_kb"] = peak_rss_kb()
+
+    results = {
+        "startup_ms": round(startup_ms, 3),
+        "load_content": bench_load_content(viewer, args.repeats),
+    }
+    rss["after_load_content_kb"] = peak_rss_kb()
+    results["decode"] = bench_decode(viewer, images, max(1, args.repeats // 2))
+    rss["after_decode_kb"] = peak_rss_kb()
+    results["marquee"] = bench_marquee(viewer, args.marquee_seconds)
+    rss["peak_kb"] = peak_rss_kb()
+    results["rss"] = rss
+
+    viewer.close()
+    app.processEvents()
+
+    return {
+        "format": BENCH_FORMAT,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM"),
+        },
+        "parameters": {
+            "images": len(images),
+            "videos": len(videos),
+            "texts_per_zone": args.texts,
+            "repeats": args.repeats,
+            "window": [args.width, args.height],
+            "setup_seconds": round(setup_s, 3),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="viewer 性能基准（离屏运行）")
+    parser.add_argument("--out", help="结果 JSON 输出路径（默认输出到标准输出）")
+    parser.add_argument("--workdir", help="数据库和合成素材目录（默认临时目录，结束后删除）")
+    parser.add_argument("--images", type=int, default=12, help="合成图片数量")
+    parser.add_argument("--videos", type=int, default=2, help="合成视频数量（需要 ffmpeg）")
+    parser.add_argument("--texts", type=int, default=5, help="每个文字区域的播放项数量")
+    parser.add_argument("--repeats", type=int, default=5, help="每项测量的重复次数")
+    parser.add_argument("--marquee-seconds", type=float, default=5.0, help="跑马灯 CPU 测量时长（秒）")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"✓ 基准结果已写入: {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -117,6 +117,39 @@ class ConfigManager:
         db_path = self._config_dir / db_filename
         return str(db_path.resolve())
     
+    def get_snapshot_cache_path(self):
+        """获取快照存档的绝对路径（应放在本地磁盘，不随数据库放在 NAS 上）"""
+        cache_filename = self.get('database.snapshot_cache', 'last_snapshot.json')
+
+        cache_path = Path(cache_filename)
+        if cache_path.is_absolute():
+            return str(cache_path.resolve())
+
+        # 否则相对于 config 目录
+        return str((self._config_dir / cache_filename).resolve())
+
+    def get_mirror_dir(self):
+        """获取本地媒体镜像目录的绝对路径，未启用镜像时返回 None"""
+        if not self.get('mirror.enabled', False):
+            return None
+        mirror_dir = Path(self.get('mirror.dir', 'media_mirror'))
+        if mirror_dir.is_absolute():
+            return str(mirror_dir.resolve())
+
+        # 否则相对于 config 目录（与 schedule 服务一致）
+        return str((self._config_dir / mirror_dir).resolve())
+
+    def get_bitmap_cache_dir(self):
+        """获取已解码图片磁盘缓存的目录（应放在本地磁盘），未启用时返回 None"""
+        if float(self.get('performance.bitmap_cache_mb', 0) or 0) <= 0:
+            return None
+        cache_dir = Path(self.get('performance.bitmap_cache_dir', 'bitmap_cache'))
+        if cache_dir.is_absolute():
+            return str(cache_dir.resolve())
+
+        # 否则相对于 config 目录
+        return str((self._config_dir / cache_dir).resolve())
+
     def get_project_root(self):
         """获取项目根目录"""
         return str(self._project_root)
@@ -1,36 +1,181 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hashlib
+import os
 import sqlite3
-from typing import List, Dict, Optional, Tuple
+import threading
+import time
+from types import MappingProxyType
+from typing import List, Dict, Mapping, NamedTuple, Optional, Tuple
 from datetime import datetime
 from logger_config import get_logger
+from metrics import metrics
+from media_mirror import MirrorResolver
 
 logger = get_logger()
 
 
+# 整屏快照查询：每个区域取最新的活跃播放列表，连同其有效播放项一次取回
+SNAPSHOT_SQL = """
+    SELECT
+        z.id AS zone_id,
+        z.code AS zone_code,
+        z.is_fullscreen,
+        p.id AS playlist_id,
+        p.name AS playlist_name,
+        p.loop_mode,
+        pi.id AS item_id,
+        pi.text_inline,
+        pi.display_ms,
+        pi.per_item_loops,
+        pi.scale_mode,
+        pi.volume,
+        pi.asset_id,
+        pi.countdown_target,
+        ma.kind,
+        ma.uri,
+        ma.text_content,
+        ma.duration_ms
+    FROM zone z
+    LEFT JOIN playlist p ON p.id = (
+        SELECT id FROM playlist
+        WHERE zone_id = z.id AND is_active = 1
+        ORDER BY id DESC
+        LIMIT 1
+    )
+    LEFT JOIN playlist_item pi ON pi.playlist_id = p.id
+        AND pi.enabled = 1
+        AND (pi.active_from IS NULL OR pi.active_from <= ?)
+        AND (pi.active_to IS NULL OR pi.active_to >= ?)
+    LEFT JOIN media_asset ma ON pi.asset_id = ma.id
+    {where}
+    ORDER BY z.id ASC, pi.play_order ASC
+"""
+
+
+class ZoneSnapshot(NamedTuple):
+    """单个区域在快照时刻的播放内容（只读）"""
+    code: str
+    playlist_id: Optional[int]
+    playlist_name: Optional[str]
+    loop_mode: Optional[str]
+    items: Tuple[Mapping, ...]
+    digest: str
+
+
+class ScreenSnapshot(NamedTuple):
+    """整屏快照（只读）：全屏区域 + 各区域内容"""
+    fullscreen_zone: Optional[str]
+    zones: Mapping[str, ZoneSnapshot]
+    taken_at: str
+
+    def items(self, zone_code: str, limit: Optional[int] = None) -> Tuple[Mapping, ...]:
+        """获取指定区域的播放项，区域不存在或无活跃列表时返回空元组"""
+        zone = self.zones.get(zone_code)
+        if not zone:
+            return ()
+        return zone.items[:limit] if limit else zone.items
+
+
 class MediaDBManager:
     """媒体数据库管理器"""
     
-    def __init__(self, db_path="media_display.db"):
+    def __init__(self, db_path="media_display.db", mirror_dir=None):
+        """mirror_dir 为本地媒体镜像目录，读取快照时优先使用镜像中的文件"""
         self.db_path = db_path
-        self._ensure_connection()
+        self._mirror = MirrorResolver(mirror_dir) if mirror_dir else None
+        self._conn = None
+        self._conn_ident = None
+        self._zone_ids = {}
+        self._lock = threading.RLock()
         self._ensure_schema()
+        self._ensure_connection()
     
     def _ensure_connection(self):
         """确保数据库连接可用"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute("PRAGMA foreign_keys = ON;")
-            conn.close()
+            self._get_conn()
         except sqlite3.Error as e:
             logger.error(f"数据库连接错误: {e}", exc_info=True)
 
+    def _file_ident(self) -> Optional[Tuple[int, int]]:
+        """数据库文件标识 (设备号, inode)，文件被替换后会变化"""
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """
+        获取长连接（只读，常驻）
+        数据库文件被整体替换（如恢复备份）时自动重连
+        """
+        ident = self._file_ident()
+        if self._conn is not None and ident == self._conn_ident:
+            return self._conn
+
+        if self._conn is not None:
+            logger.info(f"数据库文件已变化，重新连接: {self.db_path}")
+            self.close()
+
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=128,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.execute("PRAGMA query_only = ON;")
+        conn.execute("PRAGMA temp_store = MEMORY;")
+        # 数据库被写锁占用时最多等待的时间，避免读取线程无限阻塞
+        conn.execute("PRAGMA busy_timeout = 2000;")
+        self._conn = conn
+        self._conn_ident = ident
+        self._zone_ids = {}
+        return conn
+
+    def _fetchone(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._get_conn().execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._get_conn().execute(sql, params).fetchall()
+
+    def interrupt(self):
+        """中断正在执行的查询（可从其他线程调用，用于查询超时）"""
+        conn = self._conn
+        if conn is not None:
+            try:
+                conn.interrupt()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        """关闭长连接"""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+            self._conn = None
+            self._conn_ident = None
+            self._zone_ids = {}
+
     def _ensure_schema(self):
         """补充新增字段/索引，兼容旧库"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
+        # WAL 模式：viewer 读取时不阻塞 admin 写入（持久化到库文件，只需设置一次）
+        try:
+            cursor.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error as e:
+            logger.warning(f"切换 WAL 模式失败: {e}")
+
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='zone'")
         has_zone_table = cursor.fetchone()
         if not has_zone_table:
@@ -63,17 +208,58 @@ class MediaDBManager:
                 except sqlite3.Error as e:
                     logger.error(f"补充 countdown_target 字段失败: {e}")
 
+        # reload_signal 增加版本号字段
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='reload_signal'")
+        has_signal_table = cursor.fetchone()
+        if has_signal_table:
+            cursor.execute("PRAGMA table_info(reload_signal)")
+            signal_columns = [row[1] for row in cursor.fetchall()]
+            if 'version' not in signal_columns:
+                try:
+                    cursor.execute("ALTER TABLE reload_signal ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                except sqlite3.Error as e:
+                    logger.error(f"补充 reload_signal.version 字段失败: {e}")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS reload_zone (
+                  zone_code       TEXT PRIMARY KEY,
+                  version         INTEGER NOT NULL DEFAULT 0,
+                  updated_at      DATETIME NOT NULL DEFAULT (datetime('now'))
+                )
+            """)
+
+        # 图片预缩放版本 / 视频封面帧（由 admin 写入）
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='media_asset'")
+        if cursor.fetchone():
+            try:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS media_rendition (
+                      id              INTEGER PRIMARY KEY AUTOINCREMENT,
+                      asset_id        INTEGER NOT NULL REFERENCES media_asset(id) ON DELETE CASCADE,
+                      width           INTEGER NOT NULL,
+                      height          INTEGER NOT NULL,
+                      uri             TEXT NOT NULL,
+                      created_at      DATETIME NOT NULL DEFAULT (datetime('now')),
+                      UNIQUE (asset_id, width, height)
+                    )
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_rendition_asset ON media_rendition(asset_id)")
+            except sqlite3.Error as e:
+                logger.error(f"创建 media_rendition 表失败: {e}")
+
         conn.commit()
         conn.close()
     
     def get_zone_id(self, zone_code: str) -> Optional[int]:
         """根据区域代码获取区域ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM zone WHERE code = ?", (zone_code,))
-        row = cursor.fetchone()
-        conn.close()
-        return row[0] if row else None
+        with self._lock:
+            conn = self._get_conn()
+            zone_id = self._zone_ids.get(zone_code)
+            if zone_id is not None:
+                return zone_id
+            row = conn.execute("SELECT id FROM zone WHERE code = ?", (zone_code,)).fetchone()
+            if row:
+                self._zone_ids[zone_code] = row[0]
+            return row[0] if row else None
     
     def get_active_playlist(self, zone_code: str) -> Optional[Dict]:
         """获取指定区域的活跃播放列表"""
@@ -81,17 +267,13 @@ class MediaDBManager:
         if not zone_id:
             return None
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
+        row = self._fetchone("""
             SELECT id, name, loop_mode 
             FROM playlist 
             WHERE zone_id = ? AND is_active = 1 
             ORDER BY id DESC 
             LIMIT 1
         """, (zone_id,))
-        row = cursor.fetchone()
-        conn.close()
         
         if row:
             return {"id": row[0], "name": row[1], "loop_mode": row[2]}
@@ -99,13 +281,9 @@ class MediaDBManager:
 
     def get_fullscreen_zone_code(self) -> Optional[str]:
         """获取当前标记为全屏的区域代码（如有多条取第一条）"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
+        row = self._fetchone(
             "SELECT code FROM zone WHERE is_fullscreen = 1 ORDER BY id LIMIT 1"
         )
-        row = cursor.fetchone()
-        conn.close()
         return row[0] if row else None
     
     def get_playlist_items(self, zone_code: str, limit: int = 10) -> List[Dict]:
@@ -123,13 +301,9 @@ class MediaDBManager:
         
         logger.info(f"找到播放列表: {playlist['name']} (ID={playlist['id']})")
         
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         now = datetime.now().isoformat()
         
-        cursor.execute("""
+        rows = self._fetchall("""
             SELECT 
                 pi.id as item_id,
                 pi.text_inline,
@@ -154,50 +328,178 @@ class MediaDBManager:
         """, (playlist["id"], now, now, limit))
         
         items = []
-        rows = cursor.fetchall()
         logger.info(f"查询到 {len(rows)} 条播放项")
         
         for idx, row in enumerate(rows, 1):
             logger.debug(f"  [{idx}] item_id={row['item_id']}, asset_id={row['asset_id']}")
-            logger.debug(f"      text_inline={row['text_inline']}")
-            logger.debug(f"      ma.kind={row['kind']}, ma.uri={row['uri']}")
-            
-            item = {
-                "id": row["item_id"],  # 添加播放项ID
-                "kind": None,
-                "uri": None,
-                "text": row["text_inline"] or row["text_content"],
-                "display_ms": self._safe_int(row["display_ms"], 5000),
-                "loops": row["per_item_loops"] or 1,
-                "scale_mode": row["scale_mode"] or "cover",
-                "volume": row["volume"] if row["volume"] is not None else 1.0,
-            }
-
-            # 倒计时类型优先
-            if row["countdown_target"]:
-                item["kind"] = "countdown"
-                item["countdown_target"] = row["countdown_target"]
-                logger.debug(f"      → 类型: 倒计时，到期: {row['countdown_target']}")
-            elif row["text_inline"]:
-                item["kind"] = "text"
-                logger.debug(f"      → 类型: 内联文本")
-            else:
-                item["kind"] = row["kind"]
-                # 规范化URI：去掉 file:// 前缀
-                raw_uri = row["uri"]
-                item["uri"] = self.normalize_uri(raw_uri) if raw_uri else None
-                logger.debug(f"      → 类型: {item['kind']}")
-                logger.debug(f"         原始URI: {raw_uri}")
-                logger.debug(f"         规范化URI: {item['uri']}")
-                if item["kind"] == "video" and row["duration_ms"]:
-                    item["display_ms"] = self._safe_int(row["duration_ms"], item["display_ms"])
-            
-            items.append(item)
+            items.append(self._row_to_item(row))
         
-        conn.close()
         logger.info(f"返回 {len(items)} 条有效项目")
         return items
     
+    def get_screen_snapshot(self, limit: int = 50, zones=None,
+                            base: Optional[ScreenSnapshot] = None) -> ScreenSnapshot:
+        """
+        在同一个读事务内一次性读取整屏内容：全屏区域、各区域活跃播放列表及其有效播放项
+        返回不可变的 ScreenSnapshot，所有区域对应同一时间点的数据
+
+        zones: 只读取这些区域（脏区域集合），其余区域沿用 base 中的内容；
+               base 为空时忽略 zones，读取整屏
+        """
+        now = datetime.now().isoformat()
+        params = [now, now]
+        where = ""
+        if zones and base is not None:
+            zones = sorted(set(zones))
+            # 全屏区域总是重新读取，保证全屏标记最新
+            where = f"WHERE z.code IN ({','.join('?' * len(zones))}) OR z.is_fullscreen = 1"
+            params.extend(zones)
+        else:
+            zones = None
+
+        started = time.perf_counter()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("BEGIN")
+            try:
+                rows = conn.execute(SNAPSHOT_SQL.format(where=where), params).fetchall()
+                renditions = self._fetch_renditions(conn, rows)
+            finally:
+                conn.rollback()
+        metrics.observe("viewer_db_query_seconds", time.perf_counter() - started,
+                        scope="partial" if zones is not None else "full")
+
+        fullscreen_zone = None
+        zone_order = []
+        zone_meta = {}
+        zone_items = {}
+        zone_ids = {}
+        for row in rows:
+            code = row["zone_code"]
+            if code not in zone_meta:
+                zone_order.append(code)
+                zone_meta[code] = row
+                zone_items[code] = []
+                zone_ids[code] = row["zone_id"]
+                if fullscreen_zone is None and row["is_fullscreen"]:
+                    fullscreen_zone = code
+            if row["item_id"] is not None and len(zone_items[code]) < limit:
+                item = self._row_to_item(row, renditions.get(row["asset_id"]))
+                zone_items[code].append(MappingProxyType(item))
+        with self._lock:
+            # 区域 ID 缓存与连接共用锁（快照在数据库线程读取）
+            self._zone_ids.update(zone_ids)
+
+        merged = {}
+        if zones is not None:
+            # 增量读取：保留未变化区域，移除已不存在的脏区域
+            merged.update(base.zones)
+            for code in zones:
+                merged.pop(code, None)
+        for code in zone_order:
+            meta = zone_meta[code]
+            merged[code] = ZoneSnapshot(
+                code=code,
+                playlist_id=meta["playlist_id"],
+                playlist_name=meta["playlist_name"],
+                loop_mode=meta["loop_mode"],
+                items=tuple(zone_items[code]),
+                digest=self._zone_digest(meta["playlist_id"], meta["loop_mode"], zone_items[code]),
+            )
+
+        scope = f"脏区域 {', '.join(zones)}" if zones is not None else "整屏"
+        logger.info(
+            f"读取快照({scope}): {len(zone_order)} 个区域, "
+            f"{sum(len(zone_items[c]) for c in zone_order)} 条播放项, 全屏区域={fullscreen_zone}"
+        )
+        return ScreenSnapshot(
+            fullscreen_zone=fullscreen_zone,
+            zones=MappingProxyType(merged),
+            taken_at=now,
+        )
+
+    def _zone_digest(self, playlist_id, loop_mode, items) -> str:
+        """计算区域内容摘要，内容不变时摘要不变（用于 viewer 增量重载）"""
+        h = hashlib.sha1()
+        h.update(repr((playlist_id, loop_mode)).encode("utf-8"))
+        for item in items:
+            h.update(repr(sorted(item.items())).encode("utf-8"))
+        return h.hexdigest()
+
+    def _fetch_renditions(self, conn, rows) -> Dict[int, tuple]:
+        """
+        批量读取快照中图片的预缩放版本和视频的封面帧（与快照在同一读事务内）
+        返回 {asset_id: ((宽, 高, 路径), ...)}，按面积从小到大
+        """
+        asset_ids = sorted({
+            row["asset_id"] for row in rows
+            if row["kind"] in ("image", "video") and row["asset_id"]
+        })
+        if not asset_ids:
+            return {}
+        result = {}
+        # 分批查询，避免超出 SQLite 参数个数上限
+        for start in range(0, len(asset_ids), 500):
+            batch = asset_ids[start:start + 500]
+            try:
+                found = conn.execute(
+                    f"""
+                    SELECT asset_id, width, height, uri FROM media_rendition
+                    WHERE asset_id IN ({','.join('?' * len(batch))})
+                    ORDER BY asset_id, width * height
+                    """,
+                    batch,
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                # 旧库尚无该表：直接使用原图
+                logger.debug(f"读取预缩放版本失败: {e}")
+                return {}
+            for asset_id, width, height, uri in found:
+                result.setdefault(asset_id, []).append((width, height, self.normalize_uri(uri)))
+        return {asset_id: tuple(items) for asset_id, items in result.items()}
+
+    def _row_to_item(self, row, renditions=None) -> Dict:
+        """
+        将播放项查询行转换为 viewer 使用的播放项字典
+        renditions 为该图片的预缩放版本或该视频的封面帧 ((宽, 高, 路径), ...)
+        """
+        item = {
+            "id": row["item_id"],  # 添加播放项ID
+            "kind": None,
+            "uri": None,
+            "text": row["text_inline"] or row["text_content"],
+            "display_ms": self._safe_int(row["display_ms"], 5000),
+            "loops": row["per_item_loops"] or 1,
+            "scale_mode": row["scale_mode"] or "cover",
+            "volume": row["volume"] if row["volume"] is not None else 1.0,
+        }
+
+        # 倒计时类型优先
+        if row["countdown_target"]:
+            item["kind"] = "countdown"
+            item["countdown_target"] = row["countdown_target"]
+        elif row["text_inline"]:
+            item["kind"] = "text"
+        else:
+            item["kind"] = row["kind"]
+            # 规范化URI：去掉 file:// 前缀
+            raw_uri = row["uri"]
+            item["uri"] = self.normalize_uri(raw_uri) if raw_uri else None
+            if self._mirror is not None:
+                local = self._mirror.resolve(item["uri"])
+                if local != item["uri"]:
+                    # 镜像文件可能在快照使用期间被淘汰，播放时据此回退到源文件
+                    item["source_uri"] = item["uri"]
+                    item["uri"] = local
+            if item["kind"] == "video" and row["duration_ms"]:
+                item["display_ms"] = self._safe_int(row["duration_ms"], item["display_ms"])
+            if item["kind"] == "image" and renditions:
+                item["renditions"] = renditions
+            elif item["kind"] == "video" and renditions:
+                item["posters"] = renditions
+        logger.debug(f"      → 类型: {item['kind']}, uri={item['uri']}")
+        return item
+
     def normalize_uri(self, uri: str) -> str:
         """
         规范化 URI：
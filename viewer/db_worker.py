@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库工作线程
+在独立的 QThread 中读取整屏快照，完成后通过信号交给 GUI 线程，
+避免数据库被锁或磁盘缓慢时卡住跑马灯和视频渲染
+"""
+
+import os
+import sqlite3
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from logger_config import get_logger
+
+logger = get_logger()
+
+
+def _union_zones(a, b):
+    """合并两个脏区域集合，任一为 None（整屏）时结果为 None"""
+    if not a or not b:
+        return None
+    return frozenset(a) | frozenset(b)
+
+
+class DatabaseOpener(QObject):
+    """
+    在数据库线程中打开数据库（NAS 未挂载或很慢时不阻塞界面）
+    manager_factory 为 MediaDBManager 之类的构造函数
+    """
+
+    opened = pyqtSignal(object)
+    open_failed = pyqtSignal(str)
+
+    def __init__(self, manager_factory, db_path: str):
+        super().__init__()
+        self.manager_factory = manager_factory
+        self.db_path = db_path
+
+    @pyqtSlot()
+    def open(self):
+        if not os.path.exists(self.db_path):
+            self.open_failed.emit(f"数据库文件不存在: {self.db_path}")
+            return
+        try:
+            db_manager = self.manager_factory(self.db_path)
+        except Exception as e:
+            logger.error(f"打开数据库失败: {e}", exc_info=True)
+            self.open_failed.emit(str(e))
+            return
+        self.opened.emit(db_manager)
+
+
+class SnapshotWorker(QObject):
+    """运行在数据库线程中的快照读取器"""
+
+    snapshot_ready = pyqtSignal(int, object)
+    load_failed = pyqtSignal(int, str)
+
+    def __init__(self, db_manager):
+        super().__init__()
+        self.db_manager = db_manager
+
+    @pyqtSlot(int, object, object)
+    def load(self, request_id, zones, base):
+        """读取快照（zones/base 含义同 MediaDBManager.get_screen_snapshot）"""
+        try:
+            snapshot = self.db_manager.get_screen_snapshot(zones=zones, base=base)
+        except sqlite3.OperationalError as e:
+            # 数据库忙或查询被超时中断
+            self.load_failed.emit(request_id, f"数据库忙: {e}")
+            return
+        except Exception as e:
+            logger.error(f"读取快照失败: {e}", exc_info=True)
+            self.load_failed.emit(request_id, str(e))
+            return
+        self.snapshot_ready.emit(request_id, snapshot)
+
+
+class AsyncSnapshotLoader(QObject):
+    """
+    GUI 线程侧的异步快照加载器
+    - 同一时间只有一个查询在执行，期间到达的请求合并（脏区域取并集）后排队
+    - 超时后中断查询，GUI 继续显示上一份快照
+    """
+
+    snapshot_loaded = pyqtSignal(object)
+    load_failed = pyqtSignal(str)
+
+    # 投递到工作线程（跨线程自动排队执行）
+    _request = pyqtSignal(int, object, object)
+
+    def __init__(self, db_manager, thread: QThread, timeout_ms=3000, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.timeout_ms = max(100, int(timeout_ms))
+        self._seq = 0
+        self._inflight = None
+        self._queued = False
+        self._queued_zones = None
+        self._inflight_zones = None
+        self._carry = False
+        self._carry_zones = None
+        self._base = None
+
+        self._worker = SnapshotWorker(db_manager)
+        self._worker.moveToThread(thread)
+        self._request.connect(self._worker.load)
+        self._worker.snapshot_ready.connect(self._on_ready)
+        self._worker.load_failed.connect(self._on_failed)
+
+        self._timeout = QTimer(self)
+        self._timeout.setSingleShot(True)
+        self._timeout.timeout.connect(self._on_timeout)
+
+    def request(self, zones=None, base=None):
+        """
+        请求读取快照
+        zones: 脏区域集合，None 表示整屏；base: 当前显示的快照
+        """
+        if base is not None:
+            self._base = base
+        if self._inflight is not None:
+            # 已有查询在执行，合并到下一次
+            if not self._queued:
+                self._queued = True
+                self._queued_zones = zones
+            else:
+                self._queued_zones = _union_zones(self._queued_zones, zones)
+            return
+        self._dispatch(zones)
+
+    def _dispatch(self, zones):
+        if self._carry:
+            # 上次失败的脏区域并入本次请求
+            zones = _union_zones(zones, self._carry_zones)
+            self._carry = False
+            self._carry_zones = None
+        self._seq += 1
+        self._inflight = self._seq
+        self._inflight_zones = frozenset(zones) if zones else None
+        base = self._base if zones else None
+        self._timeout.start(self.timeout_ms)
+        self._request.emit(self._seq, self._inflight_zones, base)
+
+    def _finish(self, request_id) -> bool:
+        """结束一次查询，返回该结果是否为当前等待的查询"""
+        if request_id != self._inflight:
+            return False
+        self._timeout.stop()
+        self._inflight = None
+        return True
+
+    def _dispatch_queued(self):
+        if self._queued and self._inflight is None:
+            zones = self._queued_zones
+            self._queued = False
+            self._queued_zones = None
+            self._dispatch(zones)
+
+    def _on_ready(self, request_id, snapshot):
+        if not self._finish(request_id):
+            return
+        self._base = snapshot
+        self.snapshot_loaded.emit(snapshot)
+        self._dispatch_queued()
+
+    def _on_failed(self, request_id, error):
+        if not self._finish(request_id):
+            return
+        logger.warning(f"读取快照失败，继续显示上一份快照: {error}")
+        # 记住未能刷新的区域，下次请求时一并读取
+        self._carry_zones = self._inflight_zones
+        self._carry = True
+        self.load_failed.emit(error)
+        self._dispatch_queued()
+
+    def _on_timeout(self):
+        """查询超时：中断数据库查询，工作线程随后会报告失败"""
+        logger.warning(f"读取快照超时（>{self.timeout_ms}ms），中断查询")
+        self.db_manager.interrupt()
@@ -95,8 +95,30 @@ CREATE INDEX IF NOT EXISTS idx_item_enabled ON playlist_item(enabled);
 CREATE TABLE IF NOT EXISTS reload_signal (
   id              INTEGER PRIMARY KEY CHECK (id = 1),
   need_reload     INTEGER NOT NULL DEFAULT 0 CHECK (need_reload IN (0,1)),
+  version         INTEGER NOT NULL DEFAULT 0,               -- 每次触发重载 +1，viewer 据此判断是否有新信号
   updated_at      DATETIME NOT NULL DEFAULT (datetime('now'))
 );
+
+-- 6) 区域重载日志：记录每个区域最近一次被标记为需要重载时的信号版本号
+--    zone_code = '*' 表示整屏重载；只按区域记录（viewer 以区域为单位整体重新绑定，播放列表粒度无额外收益）
+CREATE TABLE IF NOT EXISTS reload_zone (
+  zone_code       TEXT PRIMARY KEY,
+  version         INTEGER NOT NULL DEFAULT 0,
+  updated_at      DATETIME NOT NULL DEFAULT (datetime('now'))
+);
+
+-- 7) 预缩放版本：入库时按区域尺寸生成（图片为缩小版，视频为封面帧），viewer 选用能覆盖显示尺寸的最小版本
+CREATE TABLE IF NOT EXISTS media_rendition (
+  id              INTEGER PRIMARY KEY AUTOINCREMENT,
+  asset_id        INTEGER NOT NULL REFERENCES media_asset(id) ON DELETE CASCADE,
+  width           INTEGER NOT NULL,
+  height          INTEGER NOT NULL,
+  uri             TEXT NOT NULL,
+  created_at      DATETIME NOT NULL DEFAULT (datetime('now')),
+  UNIQUE (asset_id, width, height)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rendition_asset ON media_rendition(asset_id);
 """
 
 # 初始区域数据
@@ -146,6 +168,12 @@ def init_database(db_path=DB_PATH):
         if 'countdown_target' not in pi_columns:
             cursor.execute("ALTER TABLE playlist_item ADD COLUMN countdown_target TEXT")
 
+        # 兼容旧库：补充重载信号版本号
+        cursor.execute("PRAGMA table_info(reload_signal)")
+        rs_columns = [row[1] for row in cursor.fetchall()]
+        if 'version' not in rs_columns:
+            cursor.execute("ALTER TABLE reload_signal ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
         # 插入初始区域数据（如果表为空）
         cursor.execute("SELECT COUNT(*) FROM zone")
         if cursor.fetchone()[0] == 0:
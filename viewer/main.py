@@ -6,9 +6,10 @@
 """
 
 import sys
+import time
 import platform
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, QMetaObject, QTimer
 from PyQt5.QtGui import QFont
 
 # 导入配置管理器
@@ -36,17 +37,113 @@ try:
 except Exception:
     ReloadObserver = None
 
+# 导入数据库工作线程
+try:
+    from db_worker import AsyncSnapshotLoader, DatabaseOpener
+except Exception:
+    AsyncSnapshotLoader = None
+    DatabaseOpener = None
+
+# 导入快照存档
+try:
+    import snapshot_store
+except Exception:
+    snapshot_store = None
+
+# 导入卡顿检测
+try:
+    from stall_watchdog import StallWatchdog
+except Exception:
+    StallWatchdog = None
+
+# 导入运行指标
+try:
+    import metrics
+except Exception:
+    metrics = None
+
 
 class MultiZoneViewer(QMainWindow):
     """多区域媒体显示主窗口"""
     
-    def __init__(self, db_manager=None, db_path=None):
+    def __init__(self, db_manager=None, db_path=None, snapshot_cache=None):
+        """
+        db_manager 为空且提供 db_path 时，在数据库线程中打开数据库；
+        snapshot_cache 为快照存档路径，启动时先据此显示上次的内容
+        """
         super().__init__()
-        self.db_manager = db_manager
+        self.db_manager = None
         self.db_path = db_path
+        self.snapshot_cache = snapshot_cache
         self.reload_observer = None
+        self.db_opener = None
+        self._db_open_hinted = False
+        self._zone_digests = {}
+        self._snapshot = None
+        # 当前重载请求的开始时间（用于统计重载耗时）
+        self._reload_started = None
+
+        # 数据库线程：打开数据库、快照读取与重载检测都在此线程执行，不阻塞界面
+        self.db_thread = QThread(self)
+        self.db_thread.setObjectName("viewer-db")
+        self.snapshot_loader = None
+        self.db_thread.start()
+
+        # 快照存档：数据库内容变化后稍后保存，播放位置定期保存
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self.save_snapshot_cache)
+        self._position_timer = QTimer(self)
+        self._position_timer.timeout.connect(self.save_snapshot_cache)
+
         self.init_ui()
+
+        # 先用存档立即出画面，再连接数据库核对
+        self.restore_snapshot_cache()
+        if db_manager is None and db_path and MediaDBManager and DatabaseOpener:
+            self.open_database()
+        else:
+            self.attach_database(db_manager)
+
+    def open_database(self):
+        """在数据库线程中打开数据库，失败时定期重试（例如 NAS 尚未挂载）"""
+        if self.db_opener is None:
+            mirror_dir = config.get_mirror_dir()
+            self.db_opener = DatabaseOpener(
+                lambda path: MediaDBManager(path, mirror_dir=mirror_dir), self.db_path
+            )
+            self.db_opener.moveToThread(self.db_thread)
+            self.db_opener.opened.connect(self.attach_database)
+            self.db_opener.open_failed.connect(self.on_database_open_failed)
+        QMetaObject.invokeMethod(self.db_opener, "open", Qt.QueuedConnection)
+
+    def on_database_open_failed(self, error):
+        retry_ms = config.get('database.open_retry_ms', 5000)
+        logger.warning(f"数据库暂不可用，{retry_ms}ms 后重试: {error}")
+        if config.get('database.auto_create', True) and not self._db_open_hinted:
+            self._db_open_hinted = True
+            logger.info("提示: 如数据库尚未创建，请运行 'python viewer/init_db.py'")
+        # 只在首次失败时显示演示内容，之后的重试不再重新绑定
+        if self._snapshot is None and not self.stage.demo_shown:
+            self.stage.bind_demo()
+        QTimer.singleShot(retry_ms, self.open_database)
+
+    def attach_database(self, db_manager):
+        """数据库就绪：创建快照加载器和重载观察者，并与数据库核对内容"""
+        self.db_manager = db_manager
+        if db_manager is not None:
+            logger.info("✓ 已连接数据库")
+        if db_manager is not None and AsyncSnapshotLoader and hasattr(db_manager, "get_screen_snapshot"):
+            self.snapshot_loader = AsyncSnapshotLoader(
+                db_manager,
+                self.db_thread,
+                timeout_ms=config.get('database.query_timeout_ms', 3000),
+                parent=self,
+            )
+            self.snapshot_loader.snapshot_loaded.connect(self.on_snapshot_loaded)
+            self.snapshot_loader.load_failed.connect(self.on_snapshot_failed)
         self.setup_reload_observer()
+        self.load_content()
 
     def init_ui(self):
         """初始化界面"""
@@ -95,89 +192,174 @@ class MultiZoneViewer(QMainWindow):
         self.bottom.setMinimumHeight(60)
         root.addWidget(self.bottom, stretch=10)
 
-        # 加载内容
-        self.load_content()
-
-    def load_content(self):
-        """从数据库加载内容"""
+    def load_content(self, zones=None):
+        """
+        从数据库加载内容
+        zones: 仅重新读取这些区域（脏区域集合），为空时读取整屏
+        """
         logger.debug(f"load_content: db_manager = {self.db_manager}")
         logger.debug(f"load_content: type = {type(self.db_manager)}")
         if self.db_manager:
-            logger.debug(f"load_content: hasattr 'get_playlist_items' = {hasattr(self.db_manager, 'get_playlist_items')}")
-            if hasattr(self.db_manager, 'get_playlist_items'):
-                logger.debug(f"load_content: get_playlist_items = {self.db_manager.get_playlist_items}")
+            logger.debug(f"load_content: hasattr 'get_screen_snapshot' = {hasattr(self.db_manager, 'get_screen_snapshot')}")
         
-        if not (self.db_manager and hasattr(self.db_manager, "get_playlist_items")):
-            logger.warning("未连接数据库，使用演示模式")
-            self.stage.bind_demo()
+        if not (self.db_manager and hasattr(self.db_manager, "get_screen_snapshot")):
+            if self._snapshot is None:
+                logger.warning("未连接数据库，使用演示模式")
+                self.stage.bind_demo()
+            else:
+                logger.warning("未连接数据库，继续显示存档内容")
             return
         
+        if self.snapshot_loader:
+            # 在数据库线程中读取，完成后回调 on_snapshot_loaded
+            self.snapshot_loader.request(zones, base=self._snapshot)
+            return
+
         try:
-            fullscreen_zone = None
-            if hasattr(self.db_manager, "get_fullscreen_zone_code"):
-                fullscreen_zone = self.db_manager.get_fullscreen_zone_code()
-                if fullscreen_zone:
-                    logger.info(f"检测到全屏区域: {fullscreen_zone}")
-
-            # 加载顶部跑马灯
-            items = self.db_manager.get_playlist_items("top_marquee", limit=50)
-            if items:
-                texts = [it.get("text", "") for it in items if it.get("text")]
-                loops = config.get('zones.top_marquee.loops_per_text', 2)
-                if texts:
-                    self.marquee.set_text_list(texts, loops_per_text=loops)
-
-            if fullscreen_zone:
-                # 全屏时仅渲染指定区域，其余区域隐藏
-                self.marquee.hide()
-                self.top_frame.hide()
-                self.bottom.hide()
-                self.stage.load_from_database(self.db_manager, fullscreen_zone=fullscreen_zone)
-                return
-            else:
-                self.marquee.show()
-                self.top_frame.show()
-                self.bottom.show()
-            
-            # 加载中部舞台
-            self.stage.load_from_database(self.db_manager)
-            
-            # 加载底部状态条
-            items = self.db_manager.get_playlist_items("bottom_strip", limit=20)
-            if items:
-                texts = [it.get("text", "") for it in items if it.get("text")]
-                if texts:
-                    self.bottom.setText(" | ".join(texts))
-            
+            snapshot = self.db_manager.get_screen_snapshot(zones=zones, base=self._snapshot)
+            self.on_snapshot_loaded(snapshot)
+        except Exception as e:
+            logger.error(f"✗ 加载数据库内容失败: {e}", exc_info=True)
+            self.on_snapshot_failed(str(e))
+
+    def on_snapshot_loaded(self, snapshot):
+        """快照读取完成（GUI 线程）"""
+        try:
+            self._snapshot = snapshot
+            self.apply_snapshot(snapshot)
             logger.info("✓ 已从数据库加载内容")
+            self._save_timer.start(2000)
+            if metrics and self._reload_started is not None:
+                metrics.metrics.observe("viewer_reload_seconds", time.perf_counter() - self._reload_started)
+                self._reload_started = None
         except Exception as e:
             logger.error(f"✗ 加载数据库内容失败: {e}", exc_info=True)
             self.stage.bind_demo()
-    
+
+    def on_snapshot_failed(self, error):
+        """快照读取失败：已有内容时保持上一份快照继续播放"""
+        self._reload_started = None
+        if metrics:
+            metrics.metrics.inc("viewer_db_errors_total")
+        if self._snapshot is None:
+            logger.error(f"✗ 加载数据库内容失败: {error}")
+            self.stage.bind_demo()
+        else:
+            logger.warning(f"数据库暂不可用，继续显示上一份快照: {error}")
+
+    def restore_snapshot_cache(self):
+        """启动时从存档恢复上次显示的内容和播放位置"""
+        if not (snapshot_store and self.snapshot_cache):
+            return
+        snapshot, positions = snapshot_store.load_snapshot(self.snapshot_cache)
+        if snapshot is None:
+            return
+        try:
+            self._snapshot = snapshot
+            self.apply_snapshot(snapshot, positions)
+            logger.info(f"✓ 已从存档恢复内容（{snapshot.taken_at}），等待与数据库核对")
+        except Exception as e:
+            logger.error(f"✗ 恢复存档内容失败: {e}", exc_info=True)
+            self._snapshot = None
+            self._zone_digests = {}
+            self.stage.bind_demo()
+        self._start_position_saves()
+
+    def save_snapshot_cache(self):
+        """保存当前快照和各区域播放位置（在线程池中写入）"""
+        if not (snapshot_store and self.snapshot_cache) or self._snapshot is None:
+            return
+        snapshot_store.save_snapshot_async(
+            self.snapshot_cache, self._snapshot, self.stage.playback_positions()
+        )
+        self._start_position_saves()
+
+    def _start_position_saves(self):
+        interval = config.get('database.snapshot_save_interval_ms', 60000)
+        if interval > 0 and not self._position_timer.isActive():
+            self._position_timer.start(interval)
+
+    def apply_snapshot(self, snapshot, positions=None):
+        """将整屏快照应用到各区域（positions 为存档中的各区域播放位置）"""
+        fullscreen_zone = snapshot.fullscreen_zone
+        if fullscreen_zone:
+            logger.info(f"检测到全屏区域: {fullscreen_zone}")
+
+        # 加载顶部跑马灯（内容未变化时不打断当前滚动）
+        items = snapshot.items("top_marquee", limit=50)
+        if items and self._zone_changed(snapshot, "top_marquee"):
+            texts = [it.get("text", "") for it in items if it.get("text")]
+            loops = config.get('zones.top_marquee.loops_per_text', 2)
+            if texts:
+                self.marquee.set_text_list(texts, loops_per_text=loops)
+
+        if fullscreen_zone:
+            # 全屏时仅渲染指定区域，其余区域隐藏
+            self.marquee.hide()
+            self.top_frame.hide()
+            self.bottom.hide()
+            self.stage.load_snapshot(snapshot, positions)
+            return
+        else:
+            self.marquee.show()
+            self.top_frame.show()
+            self.bottom.show()
+
+        # 加载中部舞台
+        self.stage.load_snapshot(snapshot, positions)
+
+        # 加载底部状态条
+        items = snapshot.items("bottom_strip", limit=20)
+        if items and self._zone_changed(snapshot, "bottom_strip"):
+            texts = [it.get("text", "") for it in items if it.get("text")]
+            if texts:
+                self.bottom.setText(" | ".join(texts))
+
+    def _zone_changed(self, snapshot, zone_code: str) -> bool:
+        """比较区域内容摘要，有变化时记录新摘要并返回 True"""
+        zone = snapshot.zones.get(zone_code)
+        digest = zone.digest if zone else None
+        if self._zone_digests.get(zone_code) == digest:
+            return False
+        self._zone_digests[zone_code] = digest
+        return True
+
     def setup_reload_observer(self):
         """设置重载观察者"""
         if not ReloadObserver or not self.db_path:
             return
         
         try:
-            # 创建观察者，每5秒检查一次
+            # 创建观察者：文件变化即时推送，每5秒轮询兜底
             self.reload_observer = ReloadObserver(self.db_path, interval_ms=5000)
             
-            # 连接重载信号到 load_content 方法
+            # 连接重载信号到 load_content 方法（跨线程，自动排队到 GUI 线程）
             self.reload_observer.reload_requested.connect(self.on_reload_requested)
             
-            # 启动观察者
-            self.reload_observer.start()
+            # 移到数据库线程并在该线程中启动，检测查询不占用 GUI 线程
+            self.reload_observer.moveToThread(self.db_thread)
+            QMetaObject.invokeMethod(self.reload_observer, "start", Qt.QueuedConnection)
             logger.info("✓ 重载观察者已启动")
         except Exception as e:
             logger.error(f"✗ 启动重载观察者失败: {e}", exc_info=True)
     
-    def on_reload_requested(self):
-        """当收到重载请求时的处理"""
+    def on_reload_requested(self, zones=None):
+        """当收到重载请求时的处理（zones 为脏区域集合，None 表示整屏）"""
         logger.info("=" * 60)
-        logger.info("收到重载请求，正在刷新内容...")
+        logger.info(f"收到重载请求，正在刷新内容... 区域: {sorted(zones) if zones else '全部'}")
         logger.info("=" * 60)
-        self.load_content()
+        if self._reload_started is None:
+            self._reload_started = time.perf_counter()
+        self.load_content(zones)
+
+    def closeEvent(self, e):
+        """关闭窗口时保存存档并停止数据库线程"""
+        self.save_snapshot_cache()
+        if self.reload_observer is not None:
+            QMetaObject.invokeMethod(self.reload_observer, "stop", Qt.BlockingQueuedConnection)
+        self.db_thread.quit()
+        self.db_thread.wait(2000)
+        super().closeEvent(e)
 
     def keyPressEvent(self, e):
         """键盘事件处理"""
@@ -204,6 +386,37 @@ def get_system_font():
     return QFont("Microsoft YaHei", 12)
 
 
+def register_metrics(viewer):
+    """注册抓取时读取的指标：内存、图片缓存、播放时钟"""
+    from widgets.pixmap_cache import get_pixmap_cache
+    from widgets.bitmap_store import get_bitmap_store
+
+    def collect():
+        stats = get_pixmap_cache().stats()
+        samples = [
+            ("viewer_process_rss_bytes", "gauge", "常驻内存", {}, metrics.process_rss_bytes()),
+            ("viewer_image_cache_hits_total", "counter", "图片缓存命中次数", {}, stats["hits"]),
+            ("viewer_image_cache_misses_total", "counter", "图片缓存未命中次数", {}, stats["misses"]),
+            ("viewer_image_cache_evictions_total", "counter", "图片缓存淘汰次数", {}, stats["evictions"]),
+            ("viewer_image_cache_hit_ratio", "gauge", "图片缓存命中率", {}, stats["hit_rate"]),
+            ("viewer_image_cache_bytes", "gauge", "图片缓存占用字节数", {}, stats["bytes"]),
+            ("viewer_image_cache_entries", "gauge", "图片缓存条目数", {}, stats["entries"]),
+            ("viewer_clock_pending", "gauge", "播放时钟待执行的回调数量", {}, viewer.stage.clock.pending()),
+        ]
+        store = get_bitmap_store()
+        if store is not None:
+            disk = store.stats()
+            samples += [
+                ("viewer_bitmap_cache_hits_total", "counter", "图片磁盘缓存命中次数", {}, disk["hits"]),
+                ("viewer_bitmap_cache_misses_total", "counter", "图片磁盘缓存未命中次数", {}, disk["misses"]),
+                ("viewer_bitmap_cache_evictions_total", "counter", "图片磁盘缓存淘汰次数", {}, disk["evictions"]),
+                ("viewer_bitmap_cache_bytes", "gauge", "图片磁盘缓存占用字节数", {}, disk["bytes"]),
+            ]
+        return samples
+
+    metrics.metrics.add_collector(collect)
+
+
 def main():
     """主函数"""
     logger.info("=" * 60)
@@ -232,35 +445,37 @@ def main():
     db_path = config.get_database_path()
     print(f"数据库路径: {db_path}")
     
-    db_manager = None
-    if MediaDBManager:
-        try:
-            import os
-            if os.path.exists(db_path):
-                db_manager = MediaDBManager(db_path)
-                print(f"✓ 已连接数据库")
-            else:
-                print(f"⚠️  数据库文件不存在: {db_path}")
-                if config.get('database.auto_create', True):
-                    print("   提示: 请运行 'python viewer/init_db.py' 创建数据库")
-        except Exception as e:
-            print(f"✗ 打开数据库失败: {e}")
-            import traceback
-            traceback.print_exc()
-    else:
+    # 快照存档路径：启动时先显示上次的内容，数据库在后台打开
+    snapshot_cache = config.get_snapshot_cache_path()
+    print(f"快照存档: {snapshot_cache}")
+
+    if not MediaDBManager:
         print("⚠️  数据库管理器模块导入失败")
-    
+
     print("=" * 60)
-    
-    print(f"[main] 准备创建 MultiZoneViewer")
-    print(f"[main] db_manager = {db_manager}")
-    print(f"[main] type = {type(db_manager)}")
-    if db_manager:
-        print(f"[main] hasattr 'get_playlist_items' = {hasattr(db_manager, 'get_playlist_items')}")
-
-    # 创建并显示主窗口
-    viewer = MultiZoneViewer(db_manager, db_path)
-    print(f"[main] viewer.db_manager = {viewer.db_manager}")
+
+    # 创建并显示主窗口（数据库在数据库线程中打开）
+    viewer = MultiZoneViewer(db_path=db_path, snapshot_cache=snapshot_cache)
+
+    # 指标端点（Prometheus 文本格式），默认关闭
+    if metrics and config.get('metrics.enabled', False):
+        register_metrics(viewer)
+        metrics.start_metrics_server(
+            config.get('metrics.host', '127.0.0.1'),
+            config.get('metrics.port', 9464),
+        )
+
+    # 界面卡顿检测：事件循环停顿超过阈值时记录调用栈和正在播放的项，诊断用，默认关闭
+    if StallWatchdog and config.get('watchdog.enabled', False):
+        watchdog = StallWatchdog(
+            threshold_ms=config.get('watchdog.stall_threshold_ms', 100),
+            heartbeat_ms=config.get('watchdog.heartbeat_ms', 50),
+            log_interval_ms=config.get('watchdog.log_interval_ms', 30000),
+            context=viewer.stage.current_items,
+            parent=viewer,
+        )
+        watchdog.start()
+        app.aboutToQuit.connect(watchdog.stop)
     
     # 根据配置决定启动模式
     if config.get('display.fullscreen', False):
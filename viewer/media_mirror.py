@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地媒体镜像（读取端）
+schedule 服务生成播放列表后把 NAS 文件复制到本机镜像目录，
+viewer 读取快照时把已镜像的路径替换为本地文件，播放时不再经过 SMB
+"""
+
+import hashlib
+import os
+from logger_config import get_logger
+
+logger = get_logger()
+
+
+def mirror_path(mirror_dir: str, source_path: str) -> str:
+    """
+    源文件在镜像目录中的位置（按源路径哈希分布，保留扩展名）
+    须与 schedule/media_mirror.py 中的同名函数保持一致
+    """
+    digest = hashlib.sha1(source_path.encode("utf-8")).hexdigest()
+    ext = os.path.splitext(source_path)[1].lower()
+    return os.path.join(mirror_dir, digest[:2], digest + ext)
+
+
+class MirrorResolver:
+    """把源路径解析为镜像中的本地文件（镜像中没有时返回原路径）"""
+
+    def __init__(self, mirror_dir: str):
+        self.mirror_dir = os.path.abspath(mirror_dir)
+        logger.info(f"本地媒体镜像: {self.mirror_dir}")
+
+    def resolve(self, path: str) -> str:
+        if not path or not os.path.isabs(path) or path.startswith(self.mirror_dir + os.sep):
+            return path
+        local = mirror_path(self.mirror_dir, path)
+        # 镜像文件校验通过后才原子改名到位，存在即完整
+        return local if os.path.isfile(local) else path
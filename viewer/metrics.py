@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标
+进程内的计数器/直方图/仪表（线程安全，记录一次只是一次加锁的字典更新），
+可选地通过本地 HTTP 端点以 Prometheus 文本格式暴露
+"""
+
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logger_config import get_logger
+
+logger = get_logger()
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 指标定义：名称 -> (类型, 说明)
+METRIC_DEFS = {
+    "viewer_transition_seconds": ("histogram", "播放项切换到内容显示的耗时"),
+    "viewer_advance_lateness_seconds": ("histogram", "播放时钟回调相对截止时间的延迟"),
+    "viewer_image_decode_seconds": ("histogram", "图片解码+缩放耗时（线程池）"),
+    "viewer_db_query_seconds": ("histogram", "整屏快照查询耗时"),
+    "viewer_reload_check_seconds": ("histogram", "重载信号检测耗时"),
+    "viewer_reload_delay_seconds": ("histogram", "检测到重载信号到发出重载请求的延迟（防抖合并）"),
+    "viewer_reload_seconds": ("histogram", "收到重载请求到新快照应用完成的耗时"),
+    "viewer_reloads_total": ("counter", "发出的重载请求次数"),
+    "viewer_transitions_total": ("counter", "播放项切换次数"),
+    "viewer_video_errors_total": ("counter", "视频播放错误次数"),
+    "viewer_image_errors_total": ("counter", "图片加载失败次数"),
+    "viewer_db_errors_total": ("counter", "快照读取失败次数"),
+    "viewer_event_loop_stall_seconds": ("histogram", "GUI 事件循环卡顿时长"),
+    "viewer_event_loop_stalls_total": ("counter", "GUI 事件循环卡顿次数"),
+}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra=()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, nbuckets: int):
+        self.counts = [0] * nbuckets
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name: str, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(len(self.buckets))
+            if index < len(self.buckets):
+                hist.counts[index] += 1
+            hist.total += seconds
+            hist.count += 1
+
+    def add_collector(self, collector):
+        """
+        注册抓取时调用的收集函数
+        collector() 返回 [(名称, 类型, 说明, 标签字典, 值), ...]，用于缓存命中率、内存等按需读取的值
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """生成 Prometheus 文本格式"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (list(h.counts), h.total, h.count) for key, h in self._histograms.items()
+            }
+
+        families = {}
+        for (name, key), value in counters.items():
+            families.setdefault(name, []).append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for (name, key), (counts, total, count) in histograms.items():
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(key)} {repr(total)}")
+            lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        defs = dict(METRIC_DEFS)
+        for collector in self._collectors:
+            try:
+                for name, kind, help_text, labels, value in collector():
+                    defs.setdefault(name, (kind, help_text))
+                    families.setdefault(name, []).append(
+                        f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}"
+                    )
+            except Exception as e:
+                logger.debug(f"指标收集失败: {e}")
+
+        out = []
+        for name in sorted(families):
+            kind, help_text = defs.get(name, ("untyped", ""))
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(families[name])
+        return "\n".join(out) + "\n"
+
+
+# 进程级注册表
+metrics = MetricsRegistry()
+
+
+def process_rss_bytes() -> int:
+    """当前常驻内存（字节），无法读取时返回 0"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host: str = "127.0.0.1", port: int = 9464):
+    """在后台线程中启动 /metrics 端点，返回 server（失败时返回 None）"""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"启动指标端点失败: {host}:{port} ({e})")
+        return None
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="viewer-metrics", daemon=True)
+    thread.start()
+    logger.info(f"✓ 指标端点: http://{host}:{port}/metrics")
+    return server
@@ -3,72 +3,226 @@
 """
 重载观察者
 监听数据库 reload_signal 表，当有更新信号时触发回调
+
+通知方式：
+- 推送：QFileSystemWatcher（inotify）监听数据库文件、WAL 文件及所在目录，
+  文件变化后用 PRAGMA data_version 判断是否有其他连接提交，再读取 reload_signal.version
+- 轮询：保留定时检查作为兜底（只读，不再回写 reload_signal）
 """
+import os
 import sqlite3
-from PyQt5.QtCore import QTimer, QObject, pyqtSignal
+import time
+from PyQt5.QtCore import QTimer, QObject, QElapsedTimer, QFileSystemWatcher, pyqtSignal, pyqtSlot
+from metrics import metrics
 
 
 class ReloadObserver(QObject):
     """重载观察者类"""
     
-    # 信号：当需要重载时发出
-    reload_requested = pyqtSignal()
+    # 信号：当需要重载时发出，参数为脏区域代码集合（None 表示整屏重载）
+    reload_requested = pyqtSignal(object)
     
-    def __init__(self, db_path, interval_ms=5000):
+    def __init__(self, db_path, interval_ms=5000, debounce_ms=300, max_delay_ms=2000):
         """
         初始化观察者
         
         Args:
             db_path: 数据库路径
-            interval_ms: 检查间隔（毫秒），默认5000ms（5秒）
+            interval_ms: 兜底轮询间隔（毫秒），默认5000ms（5秒）
+            debounce_ms: 防抖时间，连续信号在此时间内合并为一次重载
+            max_delay_ms: 持续有信号时，距第一个信号最多延迟这么久也要发出重载
         """
         super().__init__()
         self.db_path = db_path
         self.interval_ms = interval_ms
-        self.timer = QTimer()
+        self.timer = QTimer(self)
         self.timer.timeout.connect(self._check_reload_signal)
         self.last_check_time = None
+
+        # 文件监听（推送通道）
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_file_changed)
+        self.watcher.directoryChanged.connect(self._on_file_changed)
+
+        # 只读长连接，用于 data_version 检测
+        self._conn = None
+        self._conn_ident = None
+        self._data_version = None
+        self._last_version = None
+
+        # 防抖合并：收集期间的脏区域，None 表示整屏
+        self.debounce_ms = max(0, int(debounce_ms))
+        self.max_delay_ms = max(self.debounce_ms, int(max_delay_ms))
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.timeout.connect(self._flush_pending)
+        self._pending = False
+        self._pending_zones = None
+        self._pending_since = QElapsedTimer()
         
+    @pyqtSlot()
     def start(self):
-        """开始监听"""
-        print(f"[ReloadObserver] 开始监听数据库变化，间隔: {self.interval_ms}ms")
+        """开始监听（可 moveToThread 到数据库线程后在该线程中调用）"""
+        print(f"[ReloadObserver] 开始监听数据库变化（文件推送 + {self.interval_ms}ms 兜底轮询）")
+        self._last_version = self._read_signal_version()
+        self._watch_paths()
         self.timer.start(self.interval_ms)
     
+    @pyqtSlot()
     def stop(self):
         """停止监听"""
         print(f"[ReloadObserver] 停止监听")
         self.timer.stop()
+        self._debounce_timer.stop()
+        self._pending = False
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+        self._close_conn()
+
+    def _watch_paths(self):
+        """
+        注册需要监听的路径
+        文件被替换或 WAL 文件新建后需要重新注册，因此每次变化后都会调用
+        """
+        candidates = [
+            self.db_path,
+            self.db_path + "-wal",
+            os.path.dirname(os.path.abspath(self.db_path)),
+        ]
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        for path in candidates:
+            if path not in watched and os.path.exists(path):
+                self.watcher.addPath(path)
+
+    def _on_file_changed(self, _path):
+        """数据库相关文件变化"""
+        self._watch_paths()
+        self._check_reload_signal()
+
+    def _get_conn(self):
+        """获取只读长连接，数据库文件被替换时重连"""
+        try:
+            st = os.stat(self.db_path)
+            ident = (st.st_dev, st.st_ino)
+        except OSError:
+            ident = None
+        if self._conn is not None and ident == self._conn_ident:
+            return self._conn
+        self._close_conn()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA query_only = ON")
+        self._conn = conn
+        self._conn_ident = ident
+        self._data_version = None
+        return conn
+
+    def _close_conn(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
+        self._conn_ident = None
+        self._data_version = None
+
+    def _read_signal_version(self):
+        """读取当前重载信号版本号"""
+        try:
+            row = self._get_conn().execute(
+                "SELECT version FROM reload_signal WHERE id = 1"
+            ).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"[ReloadObserver] 读取重载信号版本失败: {e}")
+            return None
     
+    def _read_dirty_zones(self, conn, since_version):
+        """
+        读取自 since_version 之后被标记的区域
+        返回区域代码集合；需要整屏重载时（含 '*' 或无区域记录）返回 None
+        """
+        if since_version is None:
+            return None
+        try:
+            rows = conn.execute(
+                "SELECT zone_code FROM reload_zone WHERE version > ?", (since_version,)
+            ).fetchall()
+        except sqlite3.Error:
+            return None
+        codes = {row[0] for row in rows}
+        if not codes or '*' in codes:
+            return None
+        return frozenset(codes)
+
     def _check_reload_signal(self):
-        """检查重载信号"""
+        """检查重载信号（只读）"""
+        started = time.perf_counter()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            conn = self._get_conn()
+
+            # data_version 未变化说明没有其他连接提交过，无需查询表
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
             
             # 查询 reload_signal 表
-            cursor.execute("SELECT need_reload, updated_at FROM reload_signal WHERE id = 1")
-            row = cursor.fetchone()
+            row = conn.execute(
+                "SELECT need_reload, version, updated_at FROM reload_signal WHERE id = 1"
+            ).fetchone()
             
             if row:
-                need_reload, updated_at = row
+                need_reload, version, updated_at = row
                 
-                # 如果需要重载
-                if need_reload == 1:
-                    print(f"[ReloadObserver] 检测到重载信号，更新时间: {updated_at}")
+                # 版本号变化说明 admin 触发了新的重载
+                if need_reload == 1 and version != self._last_version:
+                    print(f"[ReloadObserver] 检测到重载信号 v{version}，更新时间: {updated_at}")
+                    dirty = self._read_dirty_zones(conn, self._last_version)
+                    self._last_version = version
                     
-                    # 清除重载标志
-                    cursor.execute("UPDATE reload_signal SET need_reload = 0 WHERE id = 1")
-                    conn.commit()
-                    
-                    # 发出重载信号
-                    self.reload_requested.emit()
-                    print(f"[ReloadObserver] 已发出重载请求")
-            
-            conn.close()
+                    # 合并到待发出的重载请求
+                    self._schedule_reload(dirty)
             
         except Exception as e:
             print(f"[ReloadObserver] 检查重载信号失败: {e}")
+            self._close_conn()
+        finally:
+            metrics.observe("viewer_reload_check_seconds", time.perf_counter() - started)
     
+    def _schedule_reload(self, zones):
+        """
+        合并重载请求并防抖
+        连续到达的信号会延后发出，但距第一个信号不超过 max_delay_ms
+        """
+        if not self._pending:
+            self._pending = True
+            self._pending_zones = set(zones) if zones else None
+            self._pending_since.start()
+        elif self._pending_zones is not None:
+            if zones:
+                self._pending_zones |= set(zones)
+            else:
+                self._pending_zones = None
+
+        remaining = self.max_delay_ms - self._pending_since.elapsed()
+        self._debounce_timer.start(max(0, min(self.debounce_ms, remaining)))
+
+    def _flush_pending(self):
+        """发出合并后的重载请求"""
+        if not self._pending:
+            return
+        zones = frozenset(self._pending_zones) if self._pending_zones else None
+        self._pending = False
+        self._pending_zones = None
+        metrics.observe("viewer_reload_delay_seconds", self._pending_since.elapsed() / 1000.0)
+        metrics.inc("viewer_reloads_total", scope="partial" if zones else "full")
+
+        # 发出重载信号
+        self.reload_requested.emit(zones)
+        print(f"[ReloadObserver] 已发出重载请求，区域: {sorted(zones) if zones else '全部'}")
+
     def trigger_reload(self):
         """手动触发重载（用于测试）"""
         try:
@@ -80,9 +234,10 @@ class ReloadObserver(QObject):
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE reload_signal 
-                SET need_reload = 1, updated_at = ? 
+                SET need_reload = 1, version = version + 1, updated_at = ? 
                 WHERE id = 1
             """, (beijing_time,))
+            _mark_full_reload(cursor, beijing_time)
             conn.commit()
             conn.close()
             print(f"[ReloadObserver] 已设置重载信号 (北京时间: {beijing_time})")
@@ -90,6 +245,17 @@ class ReloadObserver(QObject):
             print(f"[ReloadObserver] 设置重载信号失败: {e}")
 
 
+def _mark_full_reload(cursor, beijing_time):
+    """在 reload_zone 中记录整屏重载（'*'），旧库没有该表时忽略"""
+    try:
+        cursor.execute("""
+            INSERT OR REPLACE INTO reload_zone (zone_code, version, updated_at)
+            SELECT '*', version, ? FROM reload_signal WHERE id = 1
+        """, (beijing_time,))
+    except sqlite3.Error:
+        pass
+
+
 def set_reload_signal(db_path):
     """
     设置重载信号（供外部调用，如管理后台）
@@ -106,9 +272,10 @@ def set_reload_signal(db_path):
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE reload_signal 
-            SET need_reload = 1, updated_at = ? 
+            SET need_reload = 1, version = version + 1, updated_at = ? 
             WHERE id = 1
         """, (beijing_time,))
+        _mark_full_reload(cursor, beijing_time)
         conn.commit()
         conn.close()
         return True
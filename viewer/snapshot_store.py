@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快照本地存档
+保存最近一次显示的整屏快照和各区域播放位置，启动时先据此出画面，
+再在后台与数据库核对（数据库所在的 NAS 尚未挂载时也能立即播放）
+"""
+
+import json
+import os
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+from PyQt5.QtCore import QRunnable, QThreadPool
+from db_manager import ScreenSnapshot, ZoneSnapshot
+from logger_config import get_logger
+
+logger = get_logger()
+
+# 存档格式版本，结构变化时递增，旧存档直接忽略
+SNAPSHOT_FORMAT = 1
+
+
+def dump_snapshot(snapshot: ScreenSnapshot, positions: Optional[Dict[str, int]] = None) -> bytes:
+    """将快照和播放位置序列化为紧凑的 JSON"""
+    data = {
+        "format": SNAPSHOT_FORMAT,
+        "fullscreen_zone": snapshot.fullscreen_zone,
+        "taken_at": snapshot.taken_at,
+        "zones": {
+            code: {
+                "playlist_id": zone.playlist_id,
+                "playlist_name": zone.playlist_name,
+                "loop_mode": zone.loop_mode,
+                "digest": zone.digest,
+                "items": [dict(item) for item in zone.items],
+            }
+            for code, zone in snapshot.zones.items()
+        },
+        "positions": dict(positions or {}),
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_snapshot(raw: bytes) -> Tuple[Optional[ScreenSnapshot], Dict[str, int]]:
+    """解析存档，格式不符时返回 (None, {})"""
+    data = json.loads(raw.decode("utf-8"))
+    if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+        return None, {}
+    zones = {}
+    for code, zone in data.get("zones", {}).items():
+        zones[code] = ZoneSnapshot(
+            code=code,
+            playlist_id=zone.get("playlist_id"),
+            playlist_name=zone.get("playlist_name"),
+            loop_mode=zone.get("loop_mode"),
+            items=tuple(MappingProxyType(item) for item in zone.get("items", [])),
+            digest=zone.get("digest", ""),
+        )
+    snapshot = ScreenSnapshot(
+        fullscreen_zone=data.get("fullscreen_zone"),
+        zones=MappingProxyType(zones),
+        taken_at=data.get("taken_at", ""),
+    )
+    positions = {k: int(v) for k, v in data.get("positions", {}).items()}
+    return snapshot, positions
+
+
+def load_snapshot(path: str) -> Tuple[Optional[ScreenSnapshot], Dict[str, int]]:
+    """读取存档，不存在或损坏时返回 (None, {})"""
+    try:
+        with open(path, "rb") as f:
+            return parse_snapshot(f.read())
+    except FileNotFoundError:
+        return None, {}
+    except Exception as e:
+        logger.warning(f"快照存档无法读取，忽略: {path} ({e})")
+        return None, {}
+
+
+def write_atomic(path: str, raw: bytes):
+    """先写临时文件并落盘，再原子替换，断电时不会留下半个文件"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SnapshotWriteTask(QRunnable):
+    """在线程池中写入存档，不占用 GUI 线程"""
+
+    def __init__(self, path: str, raw: bytes):
+        super().__init__()
+        self.path = path
+        self.raw = raw
+
+    def run(self):
+        try:
+            write_atomic(self.path, self.raw)
+        except OSError as e:
+            logger.warning(f"保存快照存档失败: {self.path} ({e})")
+
+
+def save_snapshot_async(path: str, snapshot: ScreenSnapshot, positions: Optional[Dict[str, int]] = None):
+    """序列化后交给线程池写入"""
+    QThreadPool.globalInstance().start(SnapshotWriteTask(path, dump_snapshot(snapshot, positions)))
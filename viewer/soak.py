@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+viewer 浸泡测试（长时间运行与泄漏检测）
+离屏运行 MultiZoneViewer，用加速的播放时钟驱动 MiddleStage 完成成千上万次重载和切换，
+定期采样常驻内存、存活的 QObject 数量、tracemalloc 内存、待执行的定时器数量，
+按采样结果拟合每轮增长量，超过阈值时以非零状态退出
+
+用法:
+    python soak.py --cycles 2000 --out soak.json
+    python soak.py --cycles 500 --speed 200 --max-rss-kb-per-cycle 2
+"""
+
+import argparse
+import collections
+import contextlib
+import gc
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import shutil
+import time
+import tracemalloc
+
+from benchmark import build_database, make_images, make_videos, run_events, wait_for, peak_rss_kb
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QTimer, QCoreApplication
+from PyQt5.QtWidgets import QApplication
+
+with contextlib.redirect_stdout(sys.stderr):
+    from db_manager import MediaDBManager
+    from main import MultiZoneViewer
+
+# 报告格式版本
+SOAK_FORMAT = 1
+
+# 每轮重新绑定的区域
+SOAK_ZONES = ["left_16x9", "right_9x16", "extra_top", "bottom_cell_1"]
+
+
+def current_rss_kb() -> int:
+    """当前常驻内存（KB），读取失败时退回峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return peak_rss_kb()
+
+
+def live_qobjects() -> int:
+    """应用中存活的 QObject 数量（各顶层对象及其全部子对象）"""
+    app = QCoreApplication.instance()
+    roots = [app] + list(QApplication.topLevelWidgets())
+    return sum(1 + len(root.findChildren(QObject)) for root in roots)
+
+
+def sip_wrappers() -> collections.Counter:
+    """按类型统计 Python 侧持有的 Qt 包装对象（QMovie、QTimer 等）"""
+    return collections.Counter(
+        type(o).__name__ for o in gc.get_objects() if isinstance(o, sip.wrapper)
+    )
+
+
+def active_timers(viewer) -> int:
+    return sum(1 for t in viewer.findChildren(QTimer) if t.isActive())
+
+
+def slope(xs, ys) -> float:
+    """最小二乘拟合斜率（每轮增长量）"""
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mx, my = sum(xs) / n, sum(ys) / n
+    var = sum((x - mx) ** 2 for x in xs)
+    if var == 0:
+        return 0.0
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var
+
+
+class ContentMutator:
+    """每轮修改部分区域的内容，使其摘要变化、触发重新绑定"""
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path)
+        self.zone_ids = dict(self.conn.execute("SELECT code, id FROM zone").fetchall())
+
+    def mutate(self, cycle: int, zones):
+        for zone_code in zones:
+            self.conn.execute(
+                """
+                UPDATE playlist_item SET display_ms = ?
+                WHERE playlist_id IN (SELECT id FROM playlist WHERE zone_id = ? AND is_active = 1)
+                """,
+                (1000 + (cycle % 7) * 100, self.zone_ids[zone_code]),
+            )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def sample(viewer, cycle: int, transitions: int):
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    return {
+        "cycle": cycle,
+        "transitions": transitions,
+        "rss_kb": current_rss_kb(),
+        "qobjects": live_qobjects(),
+        "tracemalloc_bytes": traced,
+        "clock_pending": viewer.stage.clock.pending(),
+        "clock_queued": viewer.stage.clock.queued(),
+        "active_timers": active_timers(viewer),
+    }
+
+
+def run(args):
+    app = QApplication.instance() or QApplication(sys.argv)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="viewer-soak-")
+    try:
+        return _run(app, args, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run(app, args, workdir):
+    corpus_dir = os.path.join(workdir, "corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+    db_path = os.path.join(workdir, "media_display.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    images = make_images(corpus_dir, args.images)
+    videos = make_videos(corpus_dir, args.videos)
+    build_database(db_path, images, videos, texts_per_zone=3)
+
+    viewer = MultiZoneViewer(MediaDBManager(db_path), db_path)
+    viewer.resize(args.width, args.height)
+    viewer.show()
+    wait_for(viewer.snapshot_loader.snapshot_loaded, 10000)
+
+    stage = viewer.stage
+    stage.clock.speed = args.speed
+
+    # 统计切换次数
+    transitions = [0]
+    play_item = stage._play_mixed_item
+
+    def counting_play_item(frame, index):
+        transitions[0] += 1
+        play_item(frame, index)
+
+    stage._play_mixed_item = counting_play_item
+
+    mutator = ContentMutator(db_path)
+    tracemalloc.start(args.trace_frames)
+    samples = []
+    wrappers_start = None
+    trace_start = None
+    t0 = time.perf_counter()
+    try:
+        for cycle in range(1, args.cycles + 1):
+            zones = frozenset(SOAK_ZONES[: 1 + cycle % len(SOAK_ZONES)])
+            mutator.mutate(cycle, zones)
+            viewer.load_content(zones)
+            if not wait_for(viewer.snapshot_loader.snapshot_loaded, 10000):
+                raise RuntimeError(f"第 {cycle} 轮 load_content 超时")
+            run_events(args.cycle_ms)
+
+            if cycle == args.warmup:
+                gc.collect()
+                wrappers_start = sip_wrappers()
+                trace_start = tracemalloc.take_snapshot()
+            if cycle >= args.warmup and (cycle - args.warmup) % args.sample_every == 0:
+                samples.append(sample(viewer, cycle, transitions[0]))
+                s = samples[-1]
+                print(
+                    f"[soak] 第 {cycle}/{args.cycles} 轮: RSS {s['rss_kb']} KB, "
+                    f"QObject {s['qobjects']}, 待执行切换 {s['clock_pending']}, 切换 {s['transitions']}",
+                    file=sys.stderr,
+                )
+    finally:
+        mutator.close()
+
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    wrappers_end = sip_wrappers()
+    trace_end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    xs = [s["cycle"] for s in samples]
+    growth = {
+        key: round(slope(xs, [s[key] for s in samples]), 4)
+        for key in ("rss_kb", "qobjects", "tracemalloc_bytes", "clock_pending", "active_timers")
+    }
+    limits = {
+        "rss_kb": args.max_rss_kb_per_cycle,
+        "qobjects": args.max_qobjects_per_cycle,
+        "tracemalloc_bytes": args.max_traced_bytes_per_cycle,
+        "clock_pending": args.max_timers_per_cycle,
+        "active_timers": args.max_timers_per_cycle,
+    }
+    failures = [
+        f"{key} 每轮增长 {growth[key]} 超过阈值 {limit}"
+        for key, limit in limits.items()
+        if growth[key] > limit
+    ]
+
+    wrapper_growth = {}
+    if wrappers_start is not None:
+        wrapper_growth = {
+            name: wrappers_end[name] - wrappers_start.get(name, 0)
+            for name in wrappers_end
+            if wrappers_end[name] - wrappers_start.get(name, 0) > 0
+        }
+    top_allocations = []
+    if trace_start is not None:
+        for stat in trace_end.compare_to(trace_start, "lineno")[:args.top]:
+            top_allocations.append({"where": str(stat.traceback), "size_diff": stat.size_diff,
+                                    "count_diff": stat.count_diff})
+
+    viewer.close()
+    app.processEvents()
+
+    return {
+        "format": SOAK_FORMAT,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parameters": {
+            "cycles": args.cycles,
+            "warmup": args.warmup,
+            "cycle_ms": args.cycle_ms,
+            "speed": args.speed,
+            "images": len(images),
+            "videos": len(videos),
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "transitions": transitions[0],
+        "growth_per_cycle": growth,
+        "limits_per_cycle": limits,
+        "qt_wrapper_growth": wrapper_growth,
+        "top_allocations": top_allocations,
+        "peak_rss_kb": peak_rss_kb(),
+        "samples": samples,
+        "failures": failures,
+        "passed": not failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="viewer 浸泡测试（离屏运行，检测资源增长）")
+    parser.add_argument("--out", help="结果 JSON 输出路径（默认输出到标准输出）")
+    parser.add_argument("--workdir", help="数据库和合成素材目录（默认临时目录，结束后删除）")
+    parser.add_argument("--cycles", type=int, default=1000, help="重载轮数")
+    parser.add_argument("--warmup", type=int, default=50, help="预热轮数（不计入增长）")
+    parser.add_argument("--sample-every", type=int, default=25, help="采样间隔（轮）")
+    parser.add_argument("--cycle-ms", type=int, default=50, help="每轮重载后运行事件循环的时长（毫秒）")
+    parser.add_argument("--speed", type=float, default=100.0, help="播放时钟加速倍率")
+    parser.add_argument("--images", type=int, default=6)
+    parser.add_argument("--videos", type=int, default=0, help="合成视频数量（需要 ffmpeg）")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--trace-frames", type=int, default=5, help="tracemalloc 记录的调用栈深度")
+    parser.add_argument("--top", type=int, default=15, help="报告中列出的内存增长位置数量")
+    parser.add_argument("--max-rss-kb-per-cycle", type=float, default=4.0)
+    parser.add_argument("--max-qobjects-per-cycle", type=float, default=0.05)
+    parser.add_argument("--max-traced-bytes-per-cycle", type=float, default=2048.0)
+    parser.add_argument("--max-timers-per-cycle", type=float, default=0.01)
+    args = parser.parse_args()
+    args.warmup = max(1, min(args.warmup, args.cycles))
+    args.sample_every = max(1, args.sample_every)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"✓ 浸泡测试结果已写入: {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+    for failure in report["failures"]:
+        print(f"✗ {failure}", file=sys.stderr)
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面卡顿检测
+GUI 线程用定时器定期打点，看门狗线程检查打点间隔；事件循环停顿超过阈值时，
+抓取主线程当前的 Python 调用栈和各区域正在播放的项并写入日志（同一调用位置限频）
+"""
+
+import sys
+import threading
+import time
+import traceback
+from PyQt5.QtCore import QObject, QTimer, Qt
+from logger_config import get_logger
+from metrics import metrics
+
+logger = get_logger()
+
+
+class StallWatchdog(QObject):
+    """事件循环卡顿检测（需在 GUI 线程中创建）"""
+
+    def __init__(self, threshold_ms=100, heartbeat_ms=50, log_interval_ms=30000, stack_depth=25,
+                 context=None, parent=None):
+        """
+        threshold_ms: 打点比预期晚到超过该时长即视为卡顿
+        log_interval_ms: 同一调用位置的卡顿在该时长内只记录一次调用栈
+        context: 返回当前播放项描述列表的函数，在看门狗线程中调用
+        """
+        super().__init__(parent)
+        self.threshold = max(10, threshold_ms) / 1000.0
+        self.heartbeat = max(10, heartbeat_ms) / 1000.0
+        self.log_interval = max(0, log_interval_ms) / 1000.0
+        self.stack_depth = stack_depth
+        self._context = context
+        self._main_ident = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._logged_at = {}
+        self._suppressed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._beat)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._last_beat = time.monotonic()
+        self._timer.start(int(self.heartbeat * 1000))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="viewer-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"✓ 卡顿检测已启动（阈值 {int(self.threshold * 1000)}ms）")
+
+    def stop(self):
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+
+    def _run(self):
+        # 按阈值的一半轮询：卡顿最多晚半个阈值被发现，线程每秒只唤醒约 20 次（阈值 100ms）
+        poll = max(0.005, self.threshold / 2)
+        stalled_beat = None
+        reported = False
+        while not self._stop.wait(poll):
+            last_beat = self._last_beat
+            late = time.monotonic() - last_beat - self.heartbeat
+            if stalled_beat is None:
+                if late >= self.threshold:
+                    stalled_beat = last_beat
+                    reported = self._report(late)
+            elif last_beat != stalled_beat:
+                # 事件循环已恢复：卡顿时长 = 恢复后的首次打点 - 卡顿前的最后一次打点 - 打点间隔
+                duration = max(0.0, last_beat - stalled_beat - self.heartbeat)
+                stalled_beat = None
+                metrics.inc("viewer_event_loop_stalls_total")
+                metrics.observe("viewer_event_loop_stall_seconds", duration)
+                if reported:
+                    logger.info(f"界面已恢复，卡顿约 {duration * 1000:.0f}ms")
+
+    def _report(self, late: float) -> bool:
+        """卡顿进行中：抓取主线程调用栈（同一调用位置限频），返回是否写入了日志"""
+        frame = sys._current_frames().get(self._main_ident)
+        stack = traceback.extract_stack(frame)[-self.stack_depth:] if frame is not None else []
+        del frame
+        signature = tuple((f.filename, f.lineno) for f in stack[-3:])
+
+        now = time.monotonic()
+        logged = self._logged_at.get(signature)
+        if logged is not None and now - logged < self.log_interval:
+            self._suppressed += 1
+            return False
+        self._logged_at[signature] = now
+        if len(self._logged_at) > 256:
+            self._logged_at = {
+                k: v for k, v in self._logged_at.items() if now - v < self.log_interval
+            }
+
+        suppressed, self._suppressed = self._suppressed, 0
+        lines = [f"⚠️ 界面卡顿 {late * 1000:.0f}ms（仍在继续）"]
+        if suppressed:
+            lines[0] += f"，此前限频省略 {suppressed} 次"
+        lines.append("正在播放:")
+        lines.extend(f"  {entry}" for entry in self._describe_context())
+        lines.append("主线程调用栈:")
+        lines.extend(line.rstrip("\n") for line in traceback.format_list(stack))
+        logger.warning("\n".join(lines))
+        return True
+
+    def _describe_context(self) -> list:
+        if self._context is None:
+            return ["（未知）"]
+        try:
+            return self._context() or ["（无）"]
+        except Exception as e:
+            return [f"（读取失败: {e}）"]
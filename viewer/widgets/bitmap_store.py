@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已解码图片的磁盘缓存
+按目标尺寸解码后的像素写入本地文件；再次显示（包括 viewer 重启后）时以内存映射读取，
+直接在映射上构造 QImage，不解码、不复制。按容量上限 LRU 淘汰，
+最近使用时间记在文件修改时间上，重启后淘汰顺序仍然有效
+"""
+
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+from PyQt5 import sip
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QImage
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logger_config import get_logger
+from config_manager import config
+
+logger = get_logger()
+
+# 文件头：魔数、版本、宽、高、每行字节数、QImage 格式；像素数据从 HEADER_SIZE 处开始
+_HEADER = struct.Struct("<4sIIIII")
+HEADER_SIZE = 32
+MAGIC = b"MFBM"
+VERSION = 1
+SUFFIX = ".px"
+
+
+class MappedBitmap(NamedTuple):
+    """已映射的缓存文件，交给 mapped_image() 使用"""
+    mm: mmap.mmap
+    width: int
+    height: int
+    bytes_per_line: int
+    format: int
+
+
+class BitmapStore:
+    """磁盘位图缓存（open / put 可在任意线程调用）"""
+
+    def __init__(self, cache_dir: str, budget_bytes: int):
+        self.cache_dir = cache_dir
+        self.budget_bytes = max(0, int(budget_bytes))
+        self._lock = threading.Lock()
+        # 文件名 -> 字节数，按最近使用排序；首次使用时扫描目录建立
+        self._index = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(path: str, st: os.stat_result, target: QSize, cover: bool) -> str:
+        """文件标识（路径、大小、修改时间）加目标尺寸；文件被替换后自然失效"""
+        ident = f"{path}|{st.st_size}|{st.st_mtime_ns}|{target.width()}x{target.height()}|{int(bool(cover))}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + SUFFIX)
+
+    def _ensure_index(self):
+        """扫描缓存目录，按文件修改时间（即最近使用时间）排序；需持有锁"""
+        if self._index is not None:
+            return
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                file = os.path.join(root, name)
+                try:
+                    if not name.endswith(SUFFIX):
+                        # 写入中断残留的临时文件
+                        os.remove(file)
+                        continue
+                    st = os.stat(file)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-len(SUFFIX)], st.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._bytes = sum(self._index.values())
+        logger.info(f"图片磁盘缓存: {len(self._index)} 个文件, {self._bytes / 1024 ** 2:.1f} MB ({self.cache_dir})")
+        self._evict()
+
+    def _evict(self):
+        """超出容量时按最近使用从旧到新删除；需持有锁"""
+        while self._bytes > self.budget_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                # 正在使用的映射不受影响
+                os.remove(self._file(key))
+            except OSError:
+                pass
+
+    def _drop(self, key: str):
+        with self._lock:
+            size = self._index.pop(key, None)
+            if size is not None:
+                self._bytes -= size
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+    def open(self, path: str, st: os.stat_result, target: QSize, cover: bool):
+        """查找并映射缓存文件，未命中时返回 None"""
+        key = self._key(path, st, target, cover)
+        with self._lock:
+            self._ensure_index()
+            if key not in self._index:
+                self.misses += 1
+                return None
+        file = self._file(key)
+        try:
+            with open(file, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.debug(f"图片磁盘缓存不可读: {file} ({e})")
+            self._drop(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        header = _HEADER.unpack_from(mm, 0) if len(mm) >= HEADER_SIZE else None
+        if header is None or header[:2] != (MAGIC, VERSION) or len(mm) != HEADER_SIZE + header[4] * header[3]:
+            mm.close()
+            logger.warning(f"图片磁盘缓存文件损坏，已删除: {file}")
+            self._drop(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(file)
+        except OSError:
+            pass
+        _, _, width, height, bpl, fmt = header
+        return MappedBitmap(mm, width, height, bpl, fmt)
+
+    def put(self, path: str, st: os.stat_result, target: QSize, cover: bool, img: QImage):
+        """
+        写入缓存
+        存储格式（不透明 RGB888 / 透明 ARGB32）与 QPixmap 的内部格式不同，
+        显示时 QPixmap.fromImage 必然转换出自己的像素，映射可在转换后立即关闭
+        """
+        with self._lock:
+            # 先建立索引：扫描时会清理临时文件
+            self._ensure_index()
+        fmt = QImage.Format_ARGB32 if img.hasAlphaChannel() else QImage.Format_RGB888
+        img = img.convertToFormat(fmt)
+        size = HEADER_SIZE + img.bytesPerLine() * img.height()
+        if size > self.budget_bytes:
+            return
+        key = self._key(path, st, target, cover)
+        file = self._file(key)
+        tmp = f"{file}.{threading.get_ident()}.part"
+        try:
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+            with open(tmp, "wb") as f:
+                header = _HEADER.pack(MAGIC, VERSION, img.width(), img.height(), img.bytesPerLine(), int(fmt))
+                f.write(header.ljust(HEADER_SIZE, b"\0"))
+                f.write(img.constBits().asstring(size - HEADER_SIZE))
+            os.replace(tmp, file)
+        except OSError as e:
+            logger.warning(f"写入图片磁盘缓存失败: {path} ({e})")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._bytes -= old
+            self._index[key] = size
+            self._bytes += size
+            self.writes += 1
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index or ()),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+@contextlib.contextmanager
+def mapped_image(bitmap: MappedBitmap):
+    """
+    以映射中的像素构造 QImage（不解码、不复制），退出时关闭映射
+    QImage 只在 with 块内有效，需要保留时先转换为 QPixmap 或 copy()
+    """
+    try:
+        # voidptr 只取地址，不占用缓冲区导出，close 时不会因 QImage 仍存在而失败
+        address = int(sip.voidptr(bitmap.mm)) + HEADER_SIZE
+        yield QImage(sip.voidptr(address), bitmap.width, bitmap.height, bitmap.bytes_per_line,
+                     QImage.Format(bitmap.format))
+    finally:
+        bitmap.mm.close()
+
+
+_store = None
+_store_checked = False
+_store_lock = threading.Lock()
+
+
+def get_bitmap_store():
+    """获取进程级磁盘缓存（容量取自 performance.bitmap_cache_mb），未启用时返回 None"""
+    global _store, _store_checked
+    with _store_lock:
+        if not _store_checked:
+            _store_checked = True
+            cache_dir = config.get_bitmap_cache_dir()
+            if cache_dir:
+                budget_mb = float(config.get("performance.bitmap_cache_mb", 0))
+                _store = BitmapStore(cache_dir, int(budget_mb * 1024 * 1024))
+    return _store
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GIF 播放组件（内存有界）
+在线程池中逐帧解码并缩放到区域尺寸，GUI 线程只保留少量已缩放的帧（环形缓冲）；
+内存占用取决于区域尺寸和缓冲帧数，与 GIF 原始尺寸和总帧数无关
+"""
+
+import os
+import sys
+from collections import deque
+from PyQt5.QtCore import QObject, QRunnable, QSize, QThreadPool, QTimer, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+from .image_loader import ERROR_DECODE, ERROR_MISSING, scale_image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logger_config import get_logger
+
+logger = get_logger()
+
+# 帧延迟不大于该值时按默认延迟播放（与浏览器一致，避免 0 延迟的 GIF 占满 CPU）
+MIN_FRAME_DELAY_MS = 10
+DEFAULT_FRAME_DELAY_MS = 100
+
+
+def is_gif(path: str) -> bool:
+    return bool(path) and path.lower().endswith(".gif")
+
+
+class GifDecoder:
+    """
+    顺序解码 GIF 帧，播放到末尾后从第一帧重新开始
+    同一时间只由一个解码任务使用
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.reader = None
+        # 本轮已解码的帧数
+        self.index = 0
+        # 只有一帧（首轮结束后可知），无需循环解码
+        self.static = False
+        self.error = ""
+
+    def _open(self):
+        self.reader = QImageReader(self.path)
+        self.reader.setDecideFormatFromContent(True)
+        self.index = 0
+
+    def next_frame(self, target: QSize, cover: bool):
+        """
+        解码下一帧并缩放到目标尺寸
+        返回 (QImage, 延迟毫秒)；单帧 GIF 已解码完时返回 (None, 0)，失败时返回空 QImage 并设置 error
+        """
+        if self.reader is None:
+            if not os.path.exists(self.path):
+                self.error = ERROR_MISSING
+                return QImage(), 0
+            self._open()
+        img = self.reader.read()
+        if img.isNull() and self.index > 0:
+            # 一轮结束
+            if self.index == 1:
+                self.static = True
+                return None, 0
+            self._open()
+            img = self.reader.read()
+        if img.isNull():
+            logger.error(f"GIF 解码失败: {self.path} ({self.reader.errorString()})")
+            self.error = ERROR_DECODE
+            return QImage(), 0
+
+        delay = self.reader.nextImageDelay()
+        if delay <= MIN_FRAME_DELAY_MS:
+            delay = DEFAULT_FRAME_DELAY_MS
+        self.index += 1
+        frame = scale_image(img, target, cover)
+        return frame.convertToFormat(QImage.Format_ARGB32_Premultiplied), delay
+
+
+class _GifSignals(QObject):
+    # (代次, [(QImage, 延迟毫秒)], 错误, 帧宽, 帧高)
+    finished = pyqtSignal(int, object, str, int, int)
+
+
+class GifDecodeTask(QRunnable):
+    """线程池中连续解码若干帧"""
+
+    def __init__(self, decoder: GifDecoder, generation: int, count: int, target: QSize, cover: bool,
+                 signals: _GifSignals):
+        super().__init__()
+        self.decoder = decoder
+        self.generation = generation
+        self.count = count
+        self.target = QSize(target)
+        self.cover = cover
+        self.signals = signals
+
+    def run(self):
+        frames = []
+        for _ in range(self.count):
+            try:
+                img, delay = self.decoder.next_frame(self.target, self.cover)
+            except Exception as e:
+                logger.error(f"GIF 解码异常: {self.decoder.path} ({e})", exc_info=True)
+                self.decoder.error = ERROR_DECODE
+                break
+            if img is None or img.isNull():
+                break
+            frames.append((img, delay))
+        self.signals.finished.emit(self.generation, frames, self.decoder.error,
+                                   self.target.width(), self.target.height())
+
+
+class GifPlayer(QObject):
+    """
+    在指定 QLabel 上播放 GIF
+    缓冲帧低于一半时提交下一批解码任务，同一时间最多一个任务
+    """
+
+    # 首帧已显示
+    started = pyqtSignal()
+    # 无法播放（参数为失败原因：missing / decode）
+    failed = pyqtSignal(str)
+
+    def __init__(self, label, ring_frames: int = 6, parent=None, pool: QThreadPool = None):
+        super().__init__(parent)
+        self._label = label
+        self.ring_frames = max(2, int(ring_frames))
+        self._pool = pool or QThreadPool.globalInstance()
+        self._signals = _GifSignals(self)
+        self._signals.finished.connect(self._on_decoded)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._show_next)
+
+        self._ring = deque()
+        self._decoder = None
+        # 每次 start/stop 递增，丢弃旧解码器的结果
+        self._generation = 0
+        self._inflight = False
+        self._shown = False
+        # 到了换帧时间但缓冲为空，等待解码结果
+        self._waiting = False
+        self._target = QSize()
+        self._cover = True
+
+    def is_active(self) -> bool:
+        return self._decoder is not None
+
+    def start(self, path: str, target: QSize, cover: bool = True):
+        self.stop()
+        self._decoder = GifDecoder(path)
+        self._target = QSize(target)
+        self._cover = cover
+        self._refill()
+
+    def stop(self):
+        self._generation += 1
+        self._timer.stop()
+        self._ring.clear()
+        self._decoder = None
+        self._inflight = False
+        self._shown = False
+        self._waiting = False
+
+    def set_target(self, target: QSize):
+        """显示尺寸变化：丢弃已缓冲的帧，后续帧按新尺寸解码"""
+        if self._decoder is None or QSize(target) == self._target:
+            return
+        self._target = QSize(target)
+        self._ring.clear()
+        self._refill()
+
+    def _refill(self):
+        decoder = self._decoder
+        if decoder is None or self._inflight or decoder.static or decoder.error:
+            return
+        if len(self._ring) > self.ring_frames // 2:
+            return
+        self._inflight = True
+        self._pool.start(GifDecodeTask(decoder, self._generation, self.ring_frames - len(self._ring),
+                                       self._target, self._cover, self._signals))
+
+    def _on_decoded(self, generation, frames, error, width, height):
+        if generation != self._generation:
+            return
+        self._inflight = False
+        if error and not self._shown and not frames:
+            path = self._decoder.path
+            self.stop()
+            logger.error(f"GIF 无法播放: {path} ({error})")
+            self.failed.emit(error)
+            return
+        if QSize(width, height) == self._target:
+            self._ring.extend(frames)
+        # 按旧尺寸解码的帧直接丢弃
+        if not self._shown or self._waiting:
+            self._show_next()
+        else:
+            self._refill()
+
+    def _show_next(self):
+        self._waiting = False
+        if not self._ring:
+            if self._decoder is not None and not self._decoder.static:
+                self._waiting = True
+                self._refill()
+            # 单帧 GIF 保持当前画面
+            return
+        img, delay = self._ring.popleft()
+        self._label.setPixmap(QPixmap.fromImage(img))
+        if not self._shown:
+            self._shown = True
+            self.started.emit()
+        self._timer.start(delay)
+        self._refill()
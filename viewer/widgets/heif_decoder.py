@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HEIC/HEIF 图片解码（Qt 无法读取的格式）
+在小型进程池中用 Pillow + pillow-heif 解码并缩放到目标尺寸，像素写入共享内存；
+GUI 线程直接以共享内存构造 QImage 转成 QPixmap，像素数据不经过管道、不额外复制，
+解码占用的 GIL 也不影响界面线程
+"""
+
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from importlib.util import find_spec
+from multiprocessing import shared_memory
+from PyQt5 import sip
+from PyQt5.QtGui import QImage, QImageReader
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logger_config import get_logger
+from config_manager import config
+
+logger = get_logger()
+
+# 交给进程池解码的扩展名（Qt 装有对应插件时仍由 Qt 解码）
+HEIF_EXTENSIONS = ("heic", "heif")
+
+
+# ---- 子进程 ----
+
+def _init_worker():
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+
+
+def decode_to_shared_memory(path: str, width: int, height: int, cover: bool):
+    """
+    子进程中执行：解码并缩放到目标尺寸（cover 铺满后居中裁剪，否则等比完整显示），
+    像素写入新建的共享内存（由 GUI 进程读取后释放）
+
+    Returns:
+        (共享内存名, 宽, 高, 是否有透明通道, 修改时间, 解码耗时秒)
+    Raises:
+        FileNotFoundError: 文件不存在；其他异常表示解码失败
+    """
+    from PIL import Image, ImageOps
+
+    started = time.perf_counter()
+    mtime = os.path.getmtime(path)
+    with Image.open(path) as src:
+        img = ImageOps.exif_transpose(src)
+        tw, th = max(1, width), max(1, height)
+        sw, sh = img.size
+        factor = max(tw / sw, th / sh) if cover else min(tw / sw, th / sh)
+        # HEIF 不支持按比例解码：先整数倍缩小，再精确缩放
+        reduce_by = int(1 / factor) if factor < 1 else 1
+        if reduce_by >= 2:
+            img = img.reduce(reduce_by)
+        if cover:
+            img = ImageOps.fit(img, (tw, th), Image.LANCZOS)
+        else:
+            img = img.resize((max(1, round(sw * factor)), max(1, round(sh * factor))), Image.LANCZOS)
+
+        alpha = "A" in img.getbands()
+        img = img.convert("RGBA" if alpha else "RGBX")
+        data = img.tobytes()
+
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        shm.buf[:len(data)] = data
+        name = shm.name
+    finally:
+        shm.close()
+    return name, img.width, img.height, alpha, mtime, time.perf_counter() - started
+
+
+# ---- GUI 进程 ----
+
+_executor = None
+_unavailable_logged = False
+_qt_formats = None
+
+
+def available() -> bool:
+    return find_spec("PIL") is not None and find_spec("pillow_heif") is not None
+
+
+def handles(path: str) -> bool:
+    """是否应直接交给进程池解码（HEIF 且 Qt 没有对应的图片插件）"""
+    global _qt_formats
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    if ext not in HEIF_EXTENSIONS:
+        return False
+    if _qt_formats is None:
+        _qt_formats = {bytes(f).decode("ascii", "ignore").lower() for f in QImageReader.supportedImageFormats()}
+    return ext not in _qt_formats
+
+
+def _get_executor():
+    global _executor, _unavailable_logged
+    if _executor is None:
+        if not available():
+            if not _unavailable_logged:
+                _unavailable_logged = True
+                logger.warning("未安装 Pillow / pillow-heif，无法显示 HEIC/HEIF 图片")
+            return None
+        workers = max(1, int(config.get("performance.heif_workers", 2)))
+        # spawn：不 fork 已启动 Qt 线程的进程
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        logger.info(f"HEIF 解码进程池: {workers} 个进程")
+    return _executor
+
+
+def submit(path: str, width: int, height: int, cover: bool, callback) -> bool:
+    """
+    提交解码任务（任意线程可调用），完成后在进程池的结果线程中调用 callback(result, error)
+    result 交给 shared_image() 使用；进程池不可用时返回 False
+    """
+    global _executor
+    executor = _get_executor()
+    if executor is None:
+        return False
+    try:
+        future = executor.submit(decode_to_shared_memory, path, width, height, cover)
+    except BrokenProcessPool:
+        # 子进程异常退出（例如解码库崩溃）：重建进程池
+        _executor = None
+        executor = _get_executor()
+        if executor is None:
+            return False
+        future = executor.submit(decode_to_shared_memory, path, width, height, cover)
+
+    def done(f):
+        global _executor
+        try:
+            result = f.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and _executor is executor:
+                _executor = None
+            callback(None, e)
+            return
+        callback(result, None)
+
+    future.add_done_callback(done)
+    return True
+
+
+def release(result):
+    """丢弃未使用的结果，释放共享内存"""
+    try:
+        shm = shared_memory.SharedMemory(name=result[0])
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+@contextlib.contextmanager
+def shared_image(result):
+    """
+    以共享内存中的像素构造 QImage（不复制），退出时释放共享内存
+    QImage 只在 with 块内有效，需要保留时先转换为 QPixmap 或 copy()
+    """
+    name, width, height, alpha, _, _ = result
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        fmt = QImage.Format_RGBA8888 if alpha else QImage.Format_RGBX8888
+        # voidptr 只取地址，不占用缓冲区导出，close 时不会因 QImage 仍存在而失败
+        yield QImage(sip.voidptr(shm.buf), width, height, width * 4, fmt)
+    finally:
+        shm.close()
+        shm.unlink()
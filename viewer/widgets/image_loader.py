@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片异步解码组件
+在 QThreadPool 中用 QImageReader 按目标尺寸直接解码（cover 裁剪 / fit 等比），
+GUI 线程只负责把 QImage 转成 QPixmap 并显示
+Qt 无法读取的格式（HEIC/HEIF）交给 heif_decoder 的进程池解码
+启用磁盘缓存（bitmap_store）时，已解码过的图片直接映射缓存文件，不再解码
+"""
+
+import math
+import os
+import sys
+import time
+from PyQt5.QtCore import QObject, QRunnable, QSize, QThreadPool, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageIOHandler, QImageReader
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logger_config import get_logger
+from config_manager import config
+from metrics import metrics
+from . import bitmap_store, heif_decoder
+
+logger = get_logger()
+
+# 解码失败原因
+ERROR_MISSING = "missing"
+ERROR_DECODE = "decode"
+# Qt 没有该格式的插件（内部使用，转交进程池解码）
+ERROR_UNSUPPORTED = "unsupported"
+
+
+def decode_image(path: str, target: QSize, cover: bool = True):
+    """
+    按目标尺寸解码图片（可在任意线程调用）
+
+    Args:
+        path: 本地图片路径
+        target: 目标显示尺寸
+        cover: True 为铺满裁剪，False 为等比完整显示
+
+    Returns:
+        (QImage, error): 成功时 error 为 None，失败时 QImage 为空
+    """
+    if not os.path.exists(path):
+        return QImage(), ERROR_MISSING
+
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    src = reader.size()
+    tw, th = max(1, target.width()), max(1, target.height())
+
+    if src.isValid() and src.width() > 0 and src.height() > 0:
+        sw, sh = src.width(), src.height()
+        # EXIF 旋转 90/270 度时，解码尺寸作用于旋转前的图像
+        rotated = bool(reader.transformation() & QImageIOHandler.TransformationRotate90)
+        if rotated:
+            sw, sh = sh, sw
+        if cover:
+            factor = max(tw / sw, th / sh)
+        else:
+            factor = min(tw / sw, th / sh)
+        # 只缩小不放大，放大交给最终的 scaled
+        if factor < 1.0:
+            dw = max(1, math.ceil(sw * factor))
+            dh = max(1, math.ceil(sh * factor))
+            reader.setScaledSize(QSize(dh, dw) if rotated else QSize(dw, dh))
+
+    img = reader.read()
+    if img.isNull():
+        if reader.error() == QImageReader.UnsupportedFormatError:
+            return QImage(), ERROR_UNSUPPORTED
+        logger.error(f"图片解码失败: {path} ({reader.errorString()})")
+        return QImage(), ERROR_DECODE
+
+    return scale_image(img, target, cover), None
+
+
+def scale_image(img: QImage, target: QSize, cover: bool = True) -> QImage:
+    """把解码后的图片缩放到目标尺寸：cover 铺满后居中裁剪，否则等比完整显示"""
+    tw, th = max(1, target.width()), max(1, target.height())
+    if cover:
+        img = img.scaled(tw, th, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+        x_off = max(0, (img.width() - tw) // 2)
+        y_off = max(0, (img.height() - th) // 2)
+        return img.copy(x_off, y_off, tw, th)
+    return img.scaled(tw, th, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+def pick_rendition(path: str, renditions, target: QSize, cover: bool = True) -> str:
+    """
+    从预缩放版本中选出不小于目标尺寸（cover 铺满 / fit 完整显示）的最小一个，都不够大时使用原图
+
+    Args:
+        path: 原图路径
+        renditions: 预缩放版本 [(宽, 高, 路径), ...]
+    """
+    tw, th = max(1, target.width()), max(1, target.height())
+    best = None
+    for width, height, rpath in renditions or ():
+        if width <= 0 or height <= 0:
+            continue
+        factor = max(tw / width, th / height) if cover else min(tw / width, th / height)
+        if factor <= 1.0 and (best is None or width * height < best[0]):
+            best = (width * height, rpath)
+    return best[1] if best else path
+
+
+class FileWarmTask(QRunnable):
+    """
+    预热文件：stat 并读取文件头部，让 NAS/SMB 的属性缓存和页缓存提前就绪
+    用于即将播放的视频
+    """
+
+    def __init__(self, path: str, nbytes: int = 1024 * 1024):
+        super().__init__()
+        self.path = path
+        self.nbytes = nbytes
+
+    def run(self):
+        try:
+            os.stat(self.path)
+            with open(self.path, "rb") as f:
+                f.read(self.nbytes)
+        except OSError as e:
+            logger.debug(f"预热文件失败: {self.path} ({e})")
+
+
+_io_pool = None
+
+
+def get_io_pool() -> QThreadPool:
+    """
+    文件预热 / stat 专用的小线程池（线程数取自 performance.io_threads，1-2）
+    与解码共用全局线程池时，NAS 挂载变慢或卡住会占满所有线程，正在显示的图片排在预取之后
+    """
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = QThreadPool()
+        _io_pool.setMaxThreadCount(min(2, max(1, int(config.get("performance.io_threads", 2)))))
+    return _io_pool
+
+
+def prefetch_file(path: str, pool: QThreadPool):
+    """在线程池中预热文件（不阻塞调用方）"""
+    pool.start(FileWarmTask(path))
+
+
+class _DecodeSignals(QObject):
+    """QRunnable 不是 QObject，借助此对象把结果投递回 GUI 线程"""
+    finished = pyqtSignal(int, str, QImage, str, float)
+    # 进程池解码结果：(token, 路径, 结果, 错误)
+    external_finished = pyqtSignal(int, str, object, object)
+    # 磁盘缓存命中：(token, 路径, MappedBitmap, 修改时间)
+    mapped = pyqtSignal(int, str, object, float)
+
+
+def _submit_external(token: int, path: str, target: QSize, cover: bool, signals: _DecodeSignals) -> bool:
+    """交给进程池解码，结果经 signals 回到 GUI 线程；进程池不可用时返回 False"""
+    def done(result, error):
+        try:
+            signals.external_finished.emit(token, path, result, error)
+        except RuntimeError:
+            # 加载器已销毁，结果无人接收
+            if result is not None:
+                heif_decoder.release(result)
+
+    return heif_decoder.submit(path, target.width(), target.height(), cover, done)
+
+
+class ImageDecodeTask(QRunnable):
+    """线程池中的解码任务"""
+
+    def __init__(self, token: int, path: str, target: QSize, cover: bool, signals: _DecodeSignals):
+        super().__init__()
+        self.token = token
+        self.path = path
+        self.target = QSize(target)
+        self.cover = cover
+        self.signals = signals
+
+    def run(self):
+        # 修改时间随结果带回，作为缓存 key 的一部分
+        try:
+            st = os.stat(self.path)
+            mtime = st.st_mtime
+        except OSError:
+            st, mtime = None, -1.0
+        store = bitmap_store.get_bitmap_store() if st is not None else None
+        if store is not None:
+            bitmap = store.open(self.path, st, self.target, self.cover)
+            if bitmap is not None:
+                self.signals.mapped.emit(self.token, self.path, bitmap, mtime)
+                return
+        started = time.perf_counter()
+        try:
+            img, error = decode_image(self.path, self.target, self.cover)
+        except Exception as e:
+            logger.error(f"图片解码异常: {self.path} ({e})", exc_info=True)
+            img, error = QImage(), ERROR_DECODE
+        if error == ERROR_UNSUPPORTED:
+            if _submit_external(self.token, self.path, self.target, self.cover, self.signals):
+                return
+            logger.error(f"图片格式不支持: {self.path}")
+            error = ERROR_DECODE
+        if not error:
+            metrics.observe("viewer_image_decode_seconds", time.perf_counter() - started)
+        self.signals.finished.emit(self.token, self.path, img, error or "", mtime)
+        if store is not None and not error:
+            # 先交付显示，再写入磁盘缓存
+            store.put(self.path, st, self.target, self.cover, img)
+
+
+class ImageLoader(QObject):
+    """
+    异步图片加载器
+    每次 request 返回一个 token，结果通过 image_ready / image_failed 回到 GUI 线程
+    image_ready 附带文件修改时间，供 PixmapCache 使用
+    image_ready 的 QImage 需在信号处理中使用完毕（进程池解码的结果直接引用共享内存，磁盘缓存的结果直接引用映射文件）
+    """
+
+    image_ready = pyqtSignal(int, str, QImage, float)
+    image_failed = pyqtSignal(int, str, str)
+
+    def __init__(self, parent=None, pool: QThreadPool = None):
+        super().__init__(parent)
+        self._pool = pool or QThreadPool.globalInstance()
+        self._token = 0
+        self._signals = _DecodeSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.external_finished.connect(self._on_external_finished)
+        self._signals.mapped.connect(self._on_mapped)
+
+    def request(self, path: str, target: QSize, cover: bool = True) -> int:
+        """提交解码任务，返回 token"""
+        self._token += 1
+        if heif_decoder.handles(path) and _submit_external(self._token, path, target, cover, self._signals):
+            return self._token
+        self._pool.start(ImageDecodeTask(self._token, path, target, cover, self._signals))
+        return self._token
+
+    def _on_finished(self, token, path, img, error, mtime):
+        if error:
+            self.image_failed.emit(token, path, error)
+        else:
+            self.image_ready.emit(token, path, img, mtime)
+
+    def _on_external_finished(self, token, path, result, error):
+        if error is not None:
+            if isinstance(error, FileNotFoundError):
+                self.image_failed.emit(token, path, ERROR_MISSING)
+            else:
+                logger.error(f"图片解码失败: {path} ({error})")
+                self.image_failed.emit(token, path, ERROR_DECODE)
+            return
+        metrics.observe("viewer_image_decode_seconds", result[5])
+        # 接收方需在信号处理中转换为 QPixmap（QImage 直接引用共享内存）
+        with heif_decoder.shared_image(result) as img:
+            self.image_ready.emit(token, path, img, result[4])
+
+    def _on_mapped(self, token, path, bitmap, mtime):
+        # 接收方需在信号处理中转换为 QPixmap（QImage 直接引用映射的缓存文件）
+        with bitmap_store.mapped_image(bitmap) as img:
+            self.image_ready.emit(token, path, img, mtime)
@@ -3,25 +3,34 @@
 """
 跑马灯组件
 用于顶部文字滚动显示
+每条文字只渲染一次到缓存图（文字+间隙），滚动时只做贴图；
+偏移量按实际经过的时间计算，掉帧时速度不变
 """
 
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtCore import Qt, QTimer, QPoint, QSize
-from PyQt5.QtGui import QPainter, QColor, QFontMetrics
+from PyQt5.QtCore import Qt, QTimer, QElapsedTimer, QPointF, QSize
+from PyQt5.QtGui import QPainter, QColor, QFontMetrics, QPixmap, QStaticText, QTransform
+
+# 超过该宽度（设备像素）的文字不缓存为图片，改用 QStaticText
+MAX_STRIP_WIDTH = 16384
 
 
 class MarqueeLabel(QWidget):
     """跑马灯标签 - 支持文字列表循环滚动"""
-    
+
     def __init__(self, text="", parent=None, speed_px_per_step=3, interval_ms=30, gap_px=60):
         super().__init__(parent)
         self._text = text
         self._offset = 0.0
         self._gap = gap_px
-        self._speed = max(1, speed_px_per_step)
+        # 配置沿用"每步像素 + 步长间隔"，换算为每毫秒像素
+        self._interval = max(16, interval_ms)
+        self._speed = max(1, speed_px_per_step) / self._interval
         self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
         self._timer.timeout.connect(self._on_tick)
-        self._timer.start(max(16, interval_ms))
+        self._clock = QElapsedTimer()
+        self._last_ms = 0
         self._text_color = QColor(255, 255, 255)
         self._font = self.font()
         self._text_list = []
@@ -29,15 +38,24 @@ class MarqueeLabel(QWidget):
         self._loop_count = 0
         self._loops_per_text = 2
 
+        # 渲染缓存
+        self._text_w = 0
+        self._strip = None
+        self._static_text = None
+        self._strip_key = None
+        self._invalidate()
+
     def setFont(self, font):
         self._font = font
         super().setFont(font)
+        self._invalidate()
         self.updateGeometry()
         self.update()
 
     def set_text(self, text: str):
         self._text = text or ""
         self._offset = 0
+        self._invalidate()
         self.update()
 
     def set_text_list(self, text_list: list, loops_per_text: int = 2):
@@ -49,30 +67,94 @@ class MarqueeLabel(QWidget):
         if self._text_list:
             self._text = self._text_list[0]
             self._offset = 0
+            self._invalidate()
             self.update()
 
-    def _check_text_switch(self):
+    def _check_text_switch(self) -> bool:
+        """一轮滚动结束，返回是否切换了文字"""
         if not self._text_list or len(self._text_list) <= 1:
-            return
+            return False
         self._loop_count += 1
         if self._loop_count >= self._loops_per_text:
             self._loop_count = 0
             self._current_text_idx = (self._current_text_idx + 1) % len(self._text_list)
             self._text = self._text_list[self._current_text_idx]
             self._offset = 0
+            self._invalidate()
+            return True
+        return False
 
-    def _on_tick(self):
-        if not self._text:
+    def _invalidate(self):
+        """文字、字体或尺寸变化后重新测量并丢弃缓存图"""
+        self._strip = None
+        self._static_text = None
+        self._strip_key = None
+        self._text_w = QFontMetrics(self._font).horizontalAdvance(self._text) if self._text else 0
+
+    def _ensure_strip(self, height: int):
+        """渲染缓存图：一条文字加间隙，高度与内容区一致"""
+        dpr = self.devicePixelRatioF()
+        key = (height, dpr)
+        if self._strip_key == key:
             return
+        self._strip_key = key
+        self._strip = None
+        self._static_text = None
+
         fm = QFontMetrics(self._font)
-        w = fm.horizontalAdvance(self._text)
-        total = w + self._gap
-        if total > 0:
-            old = self._offset
-            self._offset = (self._offset + self._speed) % total
-            if old > self._offset:
-                self._check_text_switch()
-            self.update()
+        loop_w = self._text_w + self._gap
+        y = (height + fm.ascent() - fm.descent()) // 2
+        if loop_w * dpr > MAX_STRIP_WIDTH or height <= 0:
+            st = QStaticText(self._text)
+            st.setTextFormat(Qt.PlainText)
+            st.prepare(QTransform(), self._font)
+            self._static_text = (st, y - fm.ascent())
+            return
+
+        pm = QPixmap(int(loop_w * dpr), int(height * dpr))
+        pm.setDevicePixelRatio(dpr)
+        pm.fill(Qt.transparent)
+        p = QPainter(pm)
+        p.setRenderHint(QPainter.TextAntialiasing)
+        p.setPen(self._text_color)
+        p.setFont(self._font)
+        p.drawText(0, y, self._text)
+        p.end()
+        self._strip = pm
+
+    def _on_tick(self):
+        if not self._text or not self.isVisible():
+            return
+        if self.window().isMinimized():
+            # 窗口最小化时子控件不会收到 hideEvent，这里跳过重绘
+            return
+        now = self._clock.elapsed()
+        delta = now - self._last_ms
+        self._last_ms = now
+        total = self._text_w + self._gap
+        if total <= 0:
+            return
+        self._offset += delta * self._speed
+        while self._offset >= total:
+            self._offset -= total
+            if self._check_text_switch():
+                break
+        self.update()
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self._clock.start()
+        self._last_ms = 0
+        self._timer.start(self._interval)
+
+    def hideEvent(self, e):
+        # 隐藏（全屏模式或窗口最小化）时暂停滚动
+        super().hideEvent(e)
+        self._timer.stop()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self._strip_key = None
 
     def sizeHint(self):
         h = QFontMetrics(self._font).height() + 20
@@ -83,25 +165,27 @@ class MarqueeLabel(QWidget):
         return QSize(100, h)
 
     def paintEvent(self, _):
-        if not self._text:
+        if not self._text or self._text_w <= 0:
             return
-        p = QPainter(self)
-        p.setRenderHint(QPainter.TextAntialiasing)
-        rect = self.rect()
-        content = rect.adjusted(0, 5, 0, -5)
-        p.setPen(self._text_color)
-        p.setFont(self._font)
-        fm = QFontMetrics(self._font)
-        text_w = fm.horizontalAdvance(self._text)
-        text_h = fm.ascent()
-        if text_w <= 0 or content.width() <= 0:
-            p.end()
+        content = self.rect().adjusted(0, 5, 0, -5)
+        if content.width() <= 0:
             return
-        start_x = content.x() - int(self._offset)
-        y = content.y() + (content.height() + text_h - fm.descent()) // 2
-        loop_w = text_w + self._gap
-        x = start_x
-        while x < content.x() + content.width():
-            p.drawText(QPoint(x, y), self._text)
-            x += loop_w
+        self._ensure_strip(content.height())
+
+        p = QPainter(self)
+        loop_w = self._text_w + self._gap
+        x = content.x() - self._offset
+        right = content.x() + content.width()
+        if self._strip is not None:
+            while x < right:
+                p.drawPixmap(QPointF(x, content.y()), self._strip)
+                x += loop_w
+        else:
+            st, top = self._static_text
+            p.setRenderHint(QPainter.TextAntialiasing)
+            p.setPen(self._text_color)
+            p.setFont(self._font)
+            while x < right:
+                p.drawStaticText(QPointF(x, content.y() + top), st)
+                x += loop_w
         p.end()
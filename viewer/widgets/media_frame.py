@@ -7,14 +7,19 @@
 
 import platform
 import os
+import time
 from PyQt5.QtWidgets import QFrame, QLabel, QSizePolicy, QStackedLayout
-from PyQt5.QtCore import Qt, QTimer, QUrl
-from PyQt5.QtGui import QPixmap, QMovie
+from PyQt5.QtCore import Qt, QTimer, QUrl, QSize, pyqtSignal
+from PyQt5.QtGui import QPixmap
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent, QMediaPlaylist
 from PyQt5.QtMultimediaWidgets import QVideoWidget
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from logger_config import get_logger
+from metrics import metrics
+from .image_loader import ImageLoader, ERROR_MISSING, get_io_pool, pick_rendition, prefetch_file
+from .gif_player import GifPlayer, is_gif
+from .pixmap_cache import get_pixmap_cache
 
 logger = get_logger()
 
@@ -24,20 +29,62 @@ class MediaFrame(QFrame):
     媒体显示框架
     使用 QStackedLayout 切换显示层（文本/图片层 和 视频层）
     支持右下角倒计时显示
+    视频层为双缓冲：两套播放器交替使用，备用的一套提前载入下一个视频
+    视频层在首次需要时创建，空闲一段时间后释放
     """
+
+    # 当前视频播放结束
+    video_finished = pyqtSignal()
     
     def __init__(self, name="", parent=None, border_color="yellow"):
         super().__init__(parent)
         self.name = name
-        self._movie = None
-        self.player = QMediaPlayer(self)
-        self.playlist = QMediaPlaylist(self)
-        self.player.setPlaylist(self.playlist)
+        # 区域代码（由 MiddleStage 绑定播放列表时设置，用于指标标签）
+        self.zone_code = ""
+        # GIF 播放器（首次播放 GIF 时创建）
+        self._gif = None
+        self._gif_path = None
+        self._gif_source = None
+        self._gif_ring_frames = 6
+        # 进行中的切换：(类型, 开始时间)，内容显示时记录耗时
+        self._transition = None
+        # 双缓冲视频：self.player / self.video_widget 指向当前一套，
+        # 另一套为备用，预载后暂停在首帧；未创建时均为 None
+        self.player = None
+        self.video_widget = None
+        self.playlist = None
+        self._players = []
+        self._video_widgets = []
+        self._active_video = 0
+        self._standby_uri = None
+        self._video_duration = 0
         self._cover_images = True
         self._is_fullscreen = False
         self._base_font_px = 28
         self._current_font_px = self._base_font_px
 
+        # 异步图片解码：token 对应最近一次请求，过期结果直接丢弃
+        self._image_loader = ImageLoader(self)
+        self._image_loader.image_ready.connect(self._on_image_ready)
+        self._image_loader.image_failed.connect(self._on_image_failed)
+        self._image_token = None
+        self._image_path = None
+        # 当前图片的预缩放版本 ((宽, 高, 路径), ...)，尺寸变化时据此重新选择
+        self._image_renditions = ()
+        # 当前图片为本地镜像时的源文件路径，镜像文件被淘汰时改用
+        self._image_source = None
+        # 解码结果进入进程级缓存（各区域共用）；这里只记录进行中的解码任务
+        # key=(实际解码的路径, 宽, 高, cover)
+        self._pixmap_cache = get_pixmap_cache()
+        self._token_keys = {}
+        self._pending_keys = {}
+        self._redecode_timer = QTimer(self)
+        self._redecode_timer.setSingleShot(True)
+        self._redecode_timer.timeout.connect(self._redecode_image)
+        # 视频封面帧：视频缓冲完成前先显示在文本/图片层，缓冲完成后切到视频层
+        self._poster_token = None
+        self._awaiting_video = False
+
         self.setStyleSheet(f"QFrame {{ background-color:black; border:5px solid {border_color}; }}")
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
@@ -97,24 +144,88 @@ class MediaFrame(QFrame):
         self.countdown_label.hide()
         self.countdown_label.raise_()
 
-        # 视频层
-        self.video_widget = QVideoWidget(self)
-        self.video_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.video_widget.setAspectRatioMode(Qt.KeepAspectRatioByExpanding)
-        if platform.system() == "Darwin":
-            self.video_widget.setAttribute(Qt.WA_NativeWindow, True)
-
-        self.player.setVideoOutput(self.video_widget)
-
         self.stack.addWidget(self.content_label)
-        self.stack.addWidget(self.video_widget)
         self.stack.setCurrentWidget(self.content_label)
 
-        # 连接信号
-        self.player.error.connect(self._on_player_error)
-        self.player.mediaStatusChanged.connect(self._on_media_status_changed)
-        self.player.durationChanged.connect(self._on_video_duration_changed)
-        self.player.positionChanged.connect(self._on_video_position_changed)
+        # 视频层空闲释放
+        self._video_idle_ms = 60000
+        self._video_idle_timer = QTimer(self)
+        self._video_idle_timer.setSingleShot(True)
+        self._video_idle_timer.timeout.connect(self._release_video_stack)
+
+    def set_video_idle_release(self, idle_ms: int):
+        """视频层空闲多久后释放（毫秒，<=0 表示不释放）"""
+        self._video_idle_ms = int(idle_ms)
+
+    def set_gif_buffer_frames(self, frames: int):
+        """GIF 播放时缓冲的已缩放帧数"""
+        self._gif_ring_frames = max(2, int(frames))
+        if self._gif is not None:
+            self._gif.ring_frames = self._gif_ring_frames
+
+    def _ensure_video_stack(self):
+        """首次需要播放视频时创建两套播放器和视频层"""
+        self._video_idle_timer.stop()
+        if self._players:
+            return
+        logger.info(f"[{self.name}] 创建视频层")
+        self.playlist = QMediaPlaylist(self)
+        for _ in range(2):
+            self._create_video_layer()
+        self._active_video = 0
+        self.player = self._players[0]
+        self.video_widget = self._video_widgets[0]
+        self.player.setPlaylist(self.playlist)
+
+    def _video_idle(self):
+        """切到非视频内容后开始计算视频层空闲时间"""
+        if self._players and self._video_idle_ms > 0:
+            self._video_idle_timer.start(self._video_idle_ms)
+
+    def _release_video_stack(self):
+        """释放播放器和视频层（正在播放或已预载下一个视频时保留）"""
+        if not self._players or self._standby_uri:
+            return
+        if self.player.state() == QMediaPlayer.PlayingState:
+            return
+        logger.info(f"[{self.name}] 视频层空闲，释放播放器")
+        if self.stack.currentWidget() in self._video_widgets:
+            self.stack.setCurrentWidget(self.content_label)
+        for player in self._players:
+            player.stop()
+            player.setMedia(QMediaContent())
+            player.deleteLater()
+        for widget in self._video_widgets:
+            self.stack.removeWidget(widget)
+            widget.deleteLater()
+        self.playlist.deleteLater()
+        self._players = []
+        self._video_widgets = []
+        self.player = None
+        self.video_widget = None
+        self.playlist = None
+        self._standby_uri = None
+        self._video_duration = 0
+
+    def _create_video_layer(self):
+        """创建一套播放器和视频层"""
+        player = QMediaPlayer(self)
+        widget = QVideoWidget(self)
+        widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        widget.setAspectRatioMode(Qt.KeepAspectRatioByExpanding)
+        if platform.system() == "Darwin":
+            widget.setAttribute(Qt.WA_NativeWindow, True)
+        player.setVideoOutput(widget)
+
+        # 连接信号（处理函数中只响应当前播放器）
+        player.error.connect(self._on_player_error)
+        player.mediaStatusChanged.connect(self._on_media_status_changed)
+        player.durationChanged.connect(self._on_video_duration_changed)
+        player.positionChanged.connect(self._on_video_position_changed)
+
+        self.stack.addWidget(widget)
+        self._players.append(player)
+        self._video_widgets.append(widget)
     
     def set_resource_id(self, resource_id):
         """设置并显示资源ID"""
@@ -152,10 +263,10 @@ class MediaFrame(QFrame):
 
     def set_text(self, text: str, display_ms=0):
         """显示文本"""
-        if self._movie:
-            self._movie.stop()
-            self._movie = None
-            self.content_label.setMovie(None)
+        self._cancel_image()
+        self._video_idle()
+        self._transition = None
+        self._stop_gif()
         self.content_label.setPixmap(QPixmap())
         self.content_label.setText(text or "")
         self._apply_text_font_size()
@@ -166,43 +277,166 @@ class MediaFrame(QFrame):
         else:
             self._stop_countdown()
 
-    def set_image(self, path: str, cover=True, display_ms=5000):
-        """显示图片"""
-        logger.info(f"[{self.name}] 尝试加载图片: {path}")
-        
-        # 检查文件是否存在
-        if not os.path.exists(path):
-            logger.error(f"[{self.name}] 图片文件不存在: {path}")
-            self.set_text(f"图片不存在\n{os.path.basename(path)}")
+    def set_image(self, path: str, cover=True, display_ms=5000, renditions=None, source=None):
+        """
+        显示图片
+        解码在线程池中按当前显示尺寸进行，完成前保持上一项内容
+        renditions: 预缩放版本 [(宽, 高, 路径), ...]，选用能覆盖显示尺寸的最小版本解码
+        source: path 为本地镜像时的源文件路径，镜像文件不存在时改用
+        """
+        if is_gif(path):
+            self.set_gif(path, cover=cover, display_ms=display_ms, source=source)
             return
-        
-        # 检查文件大小
-        try:
-            file_size = os.path.getsize(path)
-            logger.debug(f"[{self.name}] 图片文件大小: {file_size} bytes")
-        except Exception as e:
-            logger.error(f"[{self.name}] 无法读取文件大小: {e}")
+        logger.info(f"[{self.name}] 尝试加载图片: {path}")
         
         self._cover_images = cover
-        if self._movie:
-            self._movie.stop()
-            self._movie = None
-            self.content_label.setMovie(None)
+        self._video_idle()
+        self._drop_poster()
+        self._begin_transition("image")
+        self._stop_gif()
         
-        pm = QPixmap(path)
-        if pm.isNull():
-            logger.error(f"[{self.name}] 图片加载失败（QPixmap.isNull）: {path}")
-            self.set_text(f"图片加载失败\n{os.path.basename(path)}")
+        self._image_path = path
+        self._image_renditions = tuple(renditions or ())
+        self._image_source = source if source != path else None
+        key = self._image_key(path, cover, self._image_renditions)
+        pm = self._pixmap_cache.get(*key)
+        if pm is not None:
+            # 缓存命中（预取或其他区域已解码）：直接显示
+            self._image_token = None
+            self._show_image(key[0], pm)
+            self._pixmap_cache.revalidate(key[0])
+        elif key in self._pending_keys:
+            # 预取进行中：等待其结果
+            self._image_token = self._pending_keys[key]
+        else:
+            self._image_token = self._request_image(key)
+        self._start_countdown(display_ms)
+
+    def prefetch_image(self, path: str, cover=True, renditions=None):
+        """按当前显示尺寸提前解码图片，供随后的 set_image 直接使用"""
+        if is_gif(path):
+            # GIF 播放时逐帧解码，这里只预热文件
+            self.prefetch_video(path)
             return
-        
-        logger.info(f"[{self.name}] ✓ 图片加载成功: {os.path.basename(path)} ({pm.width()}x{pm.height()})")
-        self._apply_pixmap(pm)
+        key = self._image_key(path, cover, renditions)
+        if key in self._pending_keys:
+            return
+        if self._pixmap_cache.contains(*key):
+            # 已缓存：只在后台确认文件未变
+            self._pixmap_cache.revalidate(key[0])
+            return
+        self._request_image(key)
+
+    def prefetch_video(self, path: str):
+        """预热即将播放的视频文件"""
+        if self._looks_like_local(path):
+            prefetch_file(path.replace('file://', ''), get_io_pool())
+
+    def _image_key(self, path: str, cover: bool, renditions=None):
+        """按当前显示尺寸确定解码来源（原图或预缩放版本）及缓存 key"""
+        size = self._image_target_size()
+        source = pick_rendition(path, renditions, size, cover)
+        return (source, size.width(), size.height(), bool(cover))
+
+    def _image_target_size(self) -> QSize:
+        """图片显示的目标尺寸（扣除边框）"""
+        return QSize(max(1, self.width() - 10), max(1, self.height() - 10))
+
+    def _cancel_image(self):
+        """放弃尚未完成的图片解码结果"""
+        self._image_token = None
+        self._image_path = None
+        self._image_renditions = ()
+        self._image_source = None
+        self._redecode_timer.stop()
+        self._drop_poster()
+
+    def _request_image(self, key) -> int:
+        """提交解码任务并登记其 key，返回 token"""
+        path, w, h, cover = key
+        token = self._image_loader.request(path, QSize(w, h), cover)
+        self._token_keys[token] = key
+        self._pending_keys[key] = token
+        return token
+
+    def _take_token_key(self, token):
+        key = self._token_keys.pop(token, None)
+        if key is not None:
+            self._pending_keys.pop(key, None)
+        return key
+
+    def _on_image_ready(self, token, path, img, mtime):
+        """解码完成（GUI 线程）：转换后写入缓存，是当前请求时显示"""
+        key = self._take_token_key(token)
+        if key is None:
+            return
+        pm = QPixmap.fromImage(img)
+        _, w, h, cover = key
+        self._pixmap_cache.put(path, mtime, w, h, cover, pm)
+        if token == self._image_token:
+            self._image_token = None
+            self._show_image(path, pm)
+        elif token == self._poster_token:
+            self._poster_token = None
+            if self._awaiting_video:
+                self._show_poster_pixmap(pm)
+
+    def _show_image(self, path, pm: QPixmap):
+        self.content_label.setPixmap(pm)
         self.stack.setCurrentWidget(self.content_label)
-        self._start_countdown(display_ms)
+        self._end_transition()
+        logger.info(f"[{self.name}] ✓ 图片加载成功: {os.path.basename(path)} ({pm.width()}x{pm.height()})")
         # 确保标签在最上层
         self.resource_id_label.raise_()
         self.countdown_label.raise_()
 
+    def _on_image_failed(self, token, path, error):
+        self._take_token_key(token)
+        if token == self._poster_token:
+            # 没有封面帧可显示：等视频缓冲完成
+            logger.warning(f"[{self.name}] 封面帧加载失败: {path} ({error})")
+            self._poster_token = None
+            return
+        if token != self._image_token:
+            return
+        if error == ERROR_MISSING and self._image_path and path != self._image_path:
+            # 预缩放版本已被删除：改用原图
+            logger.warning(f"[{self.name}] 预缩放图片不存在，改用原图: {path}")
+            self._image_renditions = ()
+            self._image_token = self._request_image(self._image_key(self._image_path, self._cover_images))
+            return
+        if error == ERROR_MISSING and self._image_source:
+            # 本地镜像已被淘汰（快照仍指向镜像路径）：改用源文件
+            logger.warning(f"[{self.name}] 本地镜像文件不存在，改用源文件: {self._image_source}")
+            self._image_path, self._image_source = self._image_source, None
+            self._image_token = self._request_image(
+                self._image_key(self._image_path, self._cover_images, self._image_renditions)
+            )
+            return
+        metrics.inc("viewer_image_errors_total", zone=self._zone_label(), reason=error)
+        if error == ERROR_MISSING:
+            logger.error(f"[{self.name}] 图片文件不存在: {path}")
+            self.set_text(f"图片不存在\n{os.path.basename(path)}")
+        else:
+            logger.error(f"[{self.name}] 图片加载失败: {path}")
+            self.set_text(f"图片加载失败\n{os.path.basename(path)}")
+
+    def _redecode_image(self):
+        """尺寸变化后按新尺寸重新解码当前图片（缓存中有则直接使用）"""
+        if self._gif is not None and self._gif.is_active():
+            self._gif.set_target(self._image_target_size())
+            return
+        if self._image_path and self.stack.currentWidget() is self.content_label:
+            key = self._image_key(self._image_path, self._cover_images, self._image_renditions)
+            pm = self._pixmap_cache.get(*key)
+            if pm is not None:
+                self._image_token = None
+                self.content_label.setPixmap(pm)
+            elif key in self._pending_keys:
+                self._image_token = self._pending_keys[key]
+            else:
+                self._image_token = self._request_image(key)
+
     def _apply_pixmap(self, pm: QPixmap):
         """应用图片（cover模式填满）"""
         target_w = max(1, self.width() - 10)
@@ -218,33 +452,199 @@ class MediaFrame(QFrame):
             scaled = pm.scaled(target_w, target_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
             self.content_label.setPixmap(scaled)
 
-    def set_gif(self, gif_path: str):
-        """显示GIF动画"""
-        mv = QMovie(gif_path)
-        if not mv.isValid():
-            self.set_text("GIF 无效")
+    def set_gif(self, gif_path: str, cover=True, display_ms=0, source=None):
+        """
+        显示GIF动画
+        帧在线程池中按当前显示尺寸逐帧解码，只缓冲少量帧；首帧就绪前保持上一项内容
+        source: gif_path 为本地镜像时的源文件路径，镜像文件不存在时改用
+        """
+        logger.info(f"[{self.name}] 尝试播放GIF: {gif_path}")
+        self._cancel_image()
+        self._video_idle()
+        self._cover_images = cover
+        self._begin_transition("gif")
+        if self._gif is None:
+            self._gif = GifPlayer(self.content_label, self._gif_ring_frames, self)
+            self._gif.started.connect(self._on_gif_started)
+            self._gif.failed.connect(self._on_gif_failed)
+        self._gif_path = gif_path
+        self._gif_source = source if source != gif_path else None
+        self._gif.start(gif_path, self._image_target_size(), cover)
+        if display_ms > 0:
+            self._start_countdown(display_ms)
+        else:
+            self._stop_countdown()
+
+    def _stop_gif(self):
+        if self._gif is not None:
+            self._gif.stop()
+
+    def _on_gif_started(self):
+        self.stack.setCurrentWidget(self.content_label)
+        self._end_transition()
+        self.resource_id_label.raise_()
+        self.countdown_label.raise_()
+
+    def _on_gif_failed(self, error):
+        if error == ERROR_MISSING and self._gif_source:
+            logger.warning(f"[{self.name}] 本地镜像文件不存在，改用源文件: {self._gif_source}")
+            self._gif_path, self._gif_source = self._gif_source, None
+            self._gif.start(self._gif_path, self._image_target_size(), self._cover_images)
             return
-        self._movie = mv
-        mv.setCacheMode(QMovie.CacheAll)
-        mv.setScaledSize(self.content_label.size())
-        self.content_label.setMovie(mv)
-        mv.start()
+        metrics.inc("viewer_image_errors_total", zone=self._zone_label(), reason=error)
+        name = os.path.basename(self._gif_path or "")
+        if error == ERROR_MISSING:
+            self.set_text(f"GIF 不存在\n{name}")
+        else:
+            self.set_text(f"GIF 无效\n{name}")
+
+    def play_video(self, uri: str, posters=None, source=None):
+        """
+        播放单个视频
+        备用播放器已预载该视频时直接切换，否则按 play_videos 正常载入
+        posters: 封面帧 [(宽, 高, 路径), ...]，正常载入时在缓冲完成前先显示
+        source: uri 为本地镜像时的源文件路径，镜像文件不存在时改用
+        """
+        if uri and uri == self._standby_uri:
+            logger.info(f"[{self.name}] 切换到预载视频: {uri}")
+            self._swap_to_standby()
+            return
+        self.play_videos([uri], loop=False, posters=posters, sources={uri: source} if source else None)
+
+    def prefetch_poster(self, posters):
+        """按当前显示尺寸提前解码视频封面帧"""
+        if posters:
+            self.prefetch_image(self._largest_poster(posters), cover=not self._is_fullscreen, renditions=posters)
+
+    @staticmethod
+    def _largest_poster(posters) -> str:
+        return max(posters, key=lambda p: p[0] * p[1])[2]
+
+    def _show_poster(self, posters) -> bool:
+        """
+        视频缓冲完成前先显示封面帧（按视频层的缩放方式选用能覆盖显示尺寸的最小封面）
+        缓存中没有时异步解码，解码完成前保持上一项内容；没有封面时返回 False
+        """
+        if not posters:
+            return False
+        key = self._image_key(self._largest_poster(posters), not self._is_fullscreen, posters)
+        self._awaiting_video = True
+        pm = self._pixmap_cache.get(*key)
+        if pm is not None:
+            self._poster_token = None
+            self._show_poster_pixmap(pm)
+        elif key in self._pending_keys:
+            self._poster_token = self._pending_keys[key]
+        else:
+            self._poster_token = self._request_image(key)
+        return True
+
+    def _show_poster_pixmap(self, pm: QPixmap):
+        self.content_label.setPixmap(pm)
         self.stack.setCurrentWidget(self.content_label)
+        self.resource_id_label.raise_()
+        self.countdown_label.raise_()
 
-    def play_videos(self, items, loop=True, start_index=0):
-        """播放视频列表"""
-        logger.info(f"[{self.name}] 准备播放 {len(items or [])} 个视频")
-        
-        # 全屏时使用信箱模式（保留比例，黑边补足）；非全屏保持原逻辑
+    def _drop_poster(self):
+        """不再等待视频缓冲（切换到其他内容）"""
+        self._poster_token = None
+        self._awaiting_video = False
+
+    def _cross_to_video(self):
+        """视频已缓冲：从封面帧切换到视频层"""
+        if not self._awaiting_video:
+            return
+        self._drop_poster()
+        self.stack.setCurrentWidget(self.video_widget)
+        self.resource_id_label.raise_()
+        self.countdown_label.raise_()
+
+    def preload_video(self, uri: str, source=None):
+        """
+        在备用播放器中预载视频并暂停在首帧，供随后的 play_video 无缝切换
+        source: uri 为本地镜像时的源文件路径，镜像文件不存在时预载源文件
+        """
+        if not uri:
+            return
+        self._ensure_video_stack()
+        if uri == self._standby_uri:
+            return
+        standby = self._players[1 - self._active_video]
+        standby.stop()
+        standby.setMedia(QMediaContent(self._video_url(self._fallback_path(uri, source))))
+        standby.pause()
+        self._standby_uri = uri
+
+    def _swap_to_standby(self):
+        """备用播放器转为当前播放器，原播放器释放媒体后作为新的备用"""
+        self._cancel_image()
+        self._video_idle_timer.stop()
+        old = self.player
+        self._active_video = 1 - self._active_video
+        self.player = self._players[self._active_video]
+        self.video_widget = self._video_widgets[self._active_video]
+        self._standby_uri = None
+        self._video_duration = self.player.duration()
+        self._begin_transition("video")
+
+        self._apply_video_aspect()
+        self.stack.setCurrentWidget(self.video_widget)
+        self.player.play()
+
+        old.stop()
+        old.setPlaylist(None)
+        old.setMedia(QMediaContent())
+
+        # 确保标签在最上层
+        self.resource_id_label.raise_()
+        self.countdown_label.raise_()
+
+    def _release_standby(self):
+        """清空备用播放器"""
+        if not self._players:
+            return
+        standby = self._players[1 - self._active_video]
+        standby.stop()
+        standby.setMedia(QMediaContent())
+        self._standby_uri = None
+
+    def _apply_video_aspect(self):
+        """全屏时使用信箱模式（保留比例，黑边补足）；非全屏保持原逻辑"""
         if self._is_fullscreen:
             self.video_widget.setAspectRatioMode(Qt.KeepAspectRatio)
         else:
             self.video_widget.setAspectRatioMode(Qt.KeepAspectRatioByExpanding)
 
+    def _video_url(self, p: str) -> QUrl:
+        if self._looks_like_local(p):
+            return QUrl.fromLocalFile(p.replace('file://', ''))
+        return QUrl(p)
+
+    def _fallback_path(self, p: str, source=None) -> str:
+        """本地镜像文件已被淘汰时改用源文件"""
+        if source and source != p and self._looks_like_local(p) and not os.path.exists(p.replace('file://', '')):
+            logger.warning(f"[{self.name}] 本地镜像文件不存在，改用源文件: {source}")
+            return source
+        return p
+
+    def play_videos(self, items, loop=True, start_index=0, posters=None, sources=None):
+        """
+        播放视频列表
+        posters 为首个视频的封面帧：先显示封面，播放器报告缓冲完成后再切到视频层
+        sources: {本地镜像路径: 源文件路径}，镜像文件不存在时改用源文件
+        """
+        logger.info(f"[{self.name}] 准备播放 {len(items or [])} 个视频")
+        self._cancel_image()
+        self._ensure_video_stack()
+        self._apply_video_aspect()
+
+        if self.player.playlist() is not self.playlist:
+            self.player.setPlaylist(self.playlist)
         self.playlist.clear()
         valid_count = 0
         
         for idx, p in enumerate(items or [], 1):
+            p = self._fallback_path(p, (sources or {}).get(p))
             # 检查文件是否存在
             if self._looks_like_local(p):
                 # 移除 file:// 前缀
@@ -278,7 +678,9 @@ class MediaFrame(QFrame):
         
         self.playlist.setPlaybackMode(QMediaPlaylist.Loop if loop else QMediaPlaylist.Sequential)
         self.playlist.setCurrentIndex(max(0, start_index))
-        self.stack.setCurrentWidget(self.video_widget)
+        if not self._show_poster(posters):
+            self.stack.setCurrentWidget(self.video_widget)
+        self._begin_transition("video")
         self.player.play()
         
         logger.info(f"[{self.name}] 开始播放视频（循环模式: {loop}）")
@@ -291,6 +693,13 @@ class MediaFrame(QFrame):
         return p.startswith(("/", "./", "../")) or p.lower().startswith("file://")
 
     def _on_player_error(self):
+        if self.sender() is not self.player:
+            # 备用播放器预载失败：放弃预载，切换时按正常流程载入并报告错误
+            logger.warning(f"[{self.name}] 预载视频失败: {self._standby_uri}")
+            metrics.inc("viewer_video_errors_total", zone=self._zone_label(), player="standby")
+            self._standby_uri = None
+            return
+        metrics.inc("viewer_video_errors_total", zone=self._zone_label(), player="active")
         error_msg = f"播放器错误: {self.player.error()} - {self.player.errorString()}"
         logger.error(f"[{self.name}] {error_msg}")
         
@@ -301,15 +710,29 @@ class MediaFrame(QFrame):
             logger.error(f"[{self.name}] 出错的媒体: {media_url}")
 
     def _on_media_status_changed(self, status):
-        pass
+        if self.sender() is not self.player:
+            return
+        if status == QMediaPlayer.BufferedMedia:
+            self._cross_to_video()
+        elif status == QMediaPlayer.EndOfMedia:
+            self._cross_to_video()
+            self.video_finished.emit()
 
     def _on_video_duration_changed(self, duration):
         """视频总时长变化"""
-        self._video_duration = duration
+        if self.sender() is self.player:
+            self._video_duration = duration
 
     def _on_video_position_changed(self, position):
         """视频播放位置变化 - 更新倒计时"""
-        if hasattr(self, '_video_duration') and self._video_duration > 0:
+        if self.sender() is not self.player:
+            return
+        if position > 0:
+            # 第一帧已开始播放（部分后端不报告 BufferedMedia，以播放位置为准）
+            self._cross_to_video()
+            if self._transition is not None:
+                self._end_transition()
+        if self._video_duration > 0:
             remaining_ms = self._video_duration - position
             remaining_sec = max(0, remaining_ms // 1000)
             self.countdown_label.setText(f"{remaining_sec}s")
@@ -397,26 +820,52 @@ class MediaFrame(QFrame):
 
     def stop(self):
         """停止当前播放并清理计时"""
-        try:
-            self.player.stop()
-        except Exception:
-            pass
+        if self._players:
+            try:
+                self.player.stop()
+                self._release_standby()
+            except Exception:
+                pass
+            self.playlist.clear()
+            self._video_idle()
+        self._cancel_image()
+        self._transition = None
+        self._stop_gif()
+        self._stop_countdown()
 
-        self.playlist.clear()
+    def _zone_label(self) -> str:
+        return self.zone_code or self.name or "unknown"
 
-        if self._movie:
-            self._movie.stop()
-            self._movie = None
-            self.content_label.setMovie(None)
+    def _begin_transition(self, kind: str):
+        self._transition = (kind, time.perf_counter())
 
-        self._stop_countdown()
+    def _end_transition(self):
+        """记录切换耗时（从开始切换到内容显示）"""
+        if self._transition is None:
+            return
+        kind, started = self._transition
+        self._transition = None
+        metrics.observe("viewer_transition_seconds", time.perf_counter() - started,
+                        zone=self._zone_label(), kind=kind)
 
     def resizeEvent(self, e):
         super().resizeEvent(e)
         if self.stack.currentWidget() is self.content_label:
             pm = self.content_label.pixmap()
             if pm and not pm.isNull():
-                self._apply_pixmap(pm)
+                cached = None
+                if self._image_path:
+                    cached = self._pixmap_cache.get(
+                        *self._image_key(self._image_path, self._cover_images, self._image_renditions)
+                    )
+                if cached is not None:
+                    # 该尺寸已解码过（例如切回原布局）
+                    self.content_label.setPixmap(cached)
+                else:
+                    # 先快速缩放当前画面，稍后按新尺寸重新解码原图
+                    self._apply_pixmap(pm)
+                    if self._image_path or (self._gif is not None and self._gif.is_active()):
+                        self._redecode_timer.start(150)
             self._apply_text_font_size()
 
         self._update_label_positions()
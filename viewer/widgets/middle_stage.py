@@ -8,13 +8,15 @@
 import os
 import sys
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtCore import QTimer, QRect
-from PyQt5.QtMultimedia import QMediaPlayer
+from PyQt5.QtCore import QRect
 from .media_frame import MediaFrame
+from .pixmap_cache import get_pixmap_cache
+from .playback_clock import PlaybackClock
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from logger_config import get_logger
 from config_manager import config
+from metrics import metrics
 
 logger = get_logger()
 
@@ -42,38 +44,71 @@ class MiddleStage(QWidget):
             "left_16x9": config.get("zones.left_16x9.default_image_duration", 5000),
             "right_9x16": config.get("zones.right_9x16.default_image_duration", 5000),
         }
+        # 预取参数：至少预取的项数、预取覆盖的最短展示时长、单次最多预取项数
+        self.prefetch_count = max(1, int(config.get("performance.prefetch_count", 2)))
+        self.prefetch_lead_ms = max(0, int(config.get("performance.prefetch_lead_ms", 10000)))
+        self.prefetch_max = max(self.prefetch_count, int(config.get("performance.prefetch_max", 4)))
+        video_idle_ms = int(config.get("performance.video_idle_release_ms", 60000))
+        gif_buffer_frames = int(config.get("performance.gif_buffer_frames", 6))
         marquee_font_px = config.get("zones.top_marquee.font_size", 36)
         self.left_16x9.set_base_font_px(58)
 
         for w in [self.left_16x9, self.right_9x16, self.extra_top, self.extra_bot, *self.bottom_cells, self.fullscreen_frame]:
             w.setParent(self)
+            w.set_video_idle_release(video_idle_ms)
+            w.set_gif_buffer_frames(gif_buffer_frames)
+            w.video_finished.connect(lambda w=w: self._on_video_finished(w))
             w.show()
 
         self.fullscreen_frame.hide()
 
+        # 各区域上次绑定内容的摘要，用于增量重载
+        self._zone_digests = {}
+        # 所有区域共用的播放时钟（图片/文字/倒计时项的切换）
+        self.clock = PlaybackClock(self)
+        # 当前是否为演示内容（数据库反复打开失败时不必每次重新绑定）
+        self.demo_shown = False
+
         self.bind_demo()
 
     def bind_demo(self):
         """演示模式 - 显示默认文字"""
+        # 先停止各区域播放并取消待执行的切换，避免过期的切换覆盖演示内容
+        self._stop_all_frames()
+        self._zone_digests = {}
+        if self.fullscreen_zone:
+            self.fullscreen_zone = None
+            self.fullscreen_frame.set_fullscreen_mode(False)
+            self.fullscreen_frame.hide()
+            for f in [self.left_16x9, self.right_9x16, self.extra_top, self.extra_bot, *self.bottom_cells]:
+                f.show()
+            self._apply_layout()
         self.left_16x9.set_text("左侧 16:9（黄色框）")
         self.right_9x16.set_text("右侧 9:16（黄色框）")
         self.extra_top.set_text("资讯 A（红框）")
         self.extra_bot.set_text("资讯 B（红框）")
         for i, cell in enumerate(self.bottom_cells, 1):
             cell.set_text(f"格子 {i}（青框）")
+        self.demo_shown = True
 
     def _stop_all_frames(self):
-        """停止所有播放器，避免隐藏时仍占用资源"""
+        """停止所有播放器和待执行的切换，避免隐藏时仍占用资源"""
         for frame in [self.left_16x9, self.right_9x16, self.extra_top, self.extra_bot, *self.bottom_cells, self.fullscreen_frame]:
+            self._cancel_advance(frame)
             frame.stop()
 
-    def load_from_database(self, db_manager, fullscreen_zone=None):
-        """从数据库加载内容"""
-        if not db_manager:
+    def load_snapshot(self, snapshot, positions=None):
+        """
+        根据整屏快照（ScreenSnapshot）加载内容
+        仅重新绑定内容摘要发生变化的区域，未变化的区域保持当前播放项、进度与计时
+        positions: 各区域起始播放位置（从存档恢复时使用）
+        """
+        if snapshot is None:
             return
+        self.demo_shown = False
+        positions = positions or {}
 
-        self._stop_all_frames()
-        self.fullscreen_zone = fullscreen_zone
+        fullscreen_zone = snapshot.fullscreen_zone
 
         normal_frames = [
             self.left_16x9,
@@ -83,11 +118,21 @@ class MiddleStage(QWidget):
             *self.bottom_cells,
         ]
 
+        # 全屏/普通模式切换时整体重建
+        if fullscreen_zone != self.fullscreen_zone:
+            logger.info(f"显示模式变化: {self.fullscreen_zone} -> {fullscreen_zone}，重建全部区域")
+            self._stop_all_frames()
+            self._zone_digests = {}
+        self.fullscreen_zone = fullscreen_zone
+        logger.debug(f"图片缓存: {get_pixmap_cache().stats()}")
+
         if fullscreen_zone:
             self.fullscreen_frame.set_fullscreen_mode(True)
             for f in normal_frames:
                 f.hide()
-            self._load_fullscreen_zone(db_manager, fullscreen_zone)
+            if self._zone_changed(snapshot, fullscreen_zone):
+                self.fullscreen_frame.stop()
+                self._load_fullscreen_zone(snapshot, fullscreen_zone, positions.get(fullscreen_zone, 0))
             self._apply_layout()
             return
         else:
@@ -95,67 +140,128 @@ class MiddleStage(QWidget):
             for f in normal_frames:
                 f.show()
             self.fullscreen_frame.hide()
-            self.fullscreen_zone = None
 
         # 左侧 16:9 - 支持图片+视频混合播放
         self.left_16x9.name = "左侧16:9"
-        items = db_manager.get_playlist_items("left_16x9", limit=20)
-        logger.info(f"[左侧16:9] 从数据库获取到 {len(items)} 个播放项")
-        if items:
-            default_ms = self.zone_default_duration.get("left_16x9", 5000)
-            self._start_mixed_playlist(
-                self.left_16x9,
-                items,
-                zone_code="left_16x9",
-                default_ms=default_ms,
-            )
-        else:
-            logger.warning(f"[左侧16:9] 没有播放项，显示默认文字")
+        if self._zone_changed(snapshot, "left_16x9"):
+            self.left_16x9.stop()
+            items = snapshot.items("left_16x9", limit=20)
+            logger.info(f"[左侧16:9] 从数据库获取到 {len(items)} 个播放项")
+            if items:
+                default_ms = self.zone_default_duration.get("left_16x9", 5000)
+                self._start_mixed_playlist(
+                    self.left_16x9,
+                    items,
+                    zone_code="left_16x9",
+                    default_ms=default_ms,
+                    start_index=positions.get("left_16x9", 0),
+                )
+            else:
+                self._clear_mixed_playlist(self.left_16x9)
+                logger.warning(f"[左侧16:9] 没有播放项，显示默认文字")
         
         # 右侧 9:16 - 支持图片+视频混合播放
         self.right_9x16.name = "右侧9:16"
-        items = db_manager.get_playlist_items("right_9x16", limit=20)
-        logger.info(f"[右侧9:16] 从数据库获取到 {len(items)} 个播放项")
-        if items:
-            default_ms = self.zone_default_duration.get("right_9x16", 5000)
-            self._start_mixed_playlist(
-                self.right_9x16,
-                items,
-                zone_code="right_9x16",
-                default_ms=default_ms,
-            )
-        else:
-            logger.warning(f"[右侧9:16] 没有播放项，显示默认文字")
+        if self._zone_changed(snapshot, "right_9x16"):
+            self.right_9x16.stop()
+            items = snapshot.items("right_9x16", limit=20)
+            logger.info(f"[右侧9:16] 从数据库获取到 {len(items)} 个播放项")
+            if items:
+                default_ms = self.zone_default_duration.get("right_9x16", 5000)
+                self._start_mixed_playlist(
+                    self.right_9x16,
+                    items,
+                    zone_code="right_9x16",
+                    default_ms=default_ms,
+                    start_index=positions.get("right_9x16", 0),
+                )
+            else:
+                self._clear_mixed_playlist(self.right_9x16)
+                logger.warning(f"[右侧9:16] 没有播放项，显示默认文字")
         
         # 顶行右侧两格
         self.extra_top.name = "右上格"
-        items = db_manager.get_playlist_items("extra_top", limit=20)
-        if items:
-            txts = [it.get("text") for it in items if it.get("text")]
-            if txts:
-                self.extra_top.set_text("\n".join(txts))
+        if self._zone_changed(snapshot, "extra_top"):
+            self._bind_text_zone(self.extra_top, snapshot.items("extra_top", limit=20))
         
         self.extra_bot.name = "右下格"
-        items = db_manager.get_playlist_items("extra_bottom", limit=20)
-        if items:
-            txts = [it.get("text") for it in items if it.get("text")]
-            if txts:
-                self.extra_bot.set_text("\n".join(txts))
+        if self._zone_changed(snapshot, "extra_bottom"):
+            self._bind_text_zone(self.extra_bot, snapshot.items("extra_bottom", limit=20))
         
         # 底部三格
         for i, cell in enumerate(self.bottom_cells, 1):
             cell.name = f"底部格{i}"
-            items = db_manager.get_playlist_items(f"bottom_cell_{i}", limit=20)
-            if items:
-                txts = [it.get("text") for it in items if it.get("text")]
-                if txts:
-                    cell.set_text("\n".join(txts))
+            if self._zone_changed(snapshot, f"bottom_cell_{i}"):
+                self._bind_text_zone(cell, snapshot.items(f"bottom_cell_{i}", limit=20))
+
+    def _zone_changed(self, snapshot, zone_code: str) -> bool:
+        """比较区域内容摘要，有变化时记录新摘要并返回 True"""
+        zone = snapshot.zones.get(zone_code)
+        digest = zone.digest if zone else None
+        if zone_code in self._zone_digests and self._zone_digests[zone_code] == digest:
+            logger.debug(f"[{zone_code}] 内容未变化，保持当前播放")
+            return False
+        self._zone_digests[zone_code] = digest
+        return True
+
+    def _bind_text_zone(self, frame: MediaFrame, items):
+        """将纯文字区域的播放项合并显示"""
+        txts = [it.get("text") for it in items if it.get("text")]
+        if txts:
+            frame.set_text("\n".join(txts))
+
+    def playback_positions(self) -> dict:
+        """各混合播放区域当前的播放位置 {区域代码: 序号}，用于保存存档"""
+        positions = {}
+        frames = [self.fullscreen_frame] if self.fullscreen_zone else [self.left_16x9, self.right_9x16]
+        for frame in frames:
+            zone_code = frame.zone_code
+            if zone_code and getattr(frame, "_mixed_playlist", None):
+                positions[zone_code] = frame._mixed_index
+        return positions
+
+    def current_items(self) -> list:
+        """
+        各区域正在播放的项（文字描述），用于卡顿诊断
+        只读取属性，可在其他线程中调用
+        """
+        entries = []
+        for frame in [self.left_16x9, self.right_9x16, self.extra_top, self.extra_bot,
+                      *self.bottom_cells, self.fullscreen_frame]:
+            playlist = getattr(frame, "_mixed_playlist", None)
+            index = getattr(frame, "_mixed_index", 0)
+            if not playlist or not 0 <= index < len(playlist):
+                continue
+            item = playlist[index]
+            entries.append(
+                f"{frame.zone_code or frame.name} 第 {index + 1}/{len(playlist)} 项: "
+                f"{item.get('type')} (ID: {item.get('item_id')}) {item.get('uri') or ''}".rstrip()
+            )
+        return entries
 
-    def _load_fullscreen_zone(self, db_manager, zone_code: str):
+    def _clear_mixed_playlist(self, frame: MediaFrame):
+        """清空混合播放列表并取消尚未触发的切换"""
+        frame._mixed_playlist = []
+        self._cancel_advance(frame)
+
+    def _schedule_advance(self, frame: MediaFrame, display_ms: int):
+        """display_ms 后切到下一项（每个区域最多一个待执行的切换）"""
+        self._cancel_advance(frame)
+        frame._advance_token = self.clock.schedule(display_ms, lambda: self._on_advance(frame))
+
+    def _cancel_advance(self, frame: MediaFrame):
+        self.clock.cancel(getattr(frame, "_advance_token", None))
+        frame._advance_token = None
+
+    def _on_advance(self, frame: MediaFrame):
+        frame._advance_token = None
+        self._play_next_mixed_item(frame)
+
+    def _load_fullscreen_zone(self, snapshot, zone_code: str, start_index: int = 0):
         """加载并播放指定区域的全屏内容"""
         self.fullscreen_zone = zone_code
         self.fullscreen_frame.name = f"全屏:{zone_code}"
-        items = db_manager.get_playlist_items(zone_code, limit=50)
+        items = snapshot.items(zone_code, limit=50)
         default_ms = self.zone_default_duration.get(
             zone_code,
             config.get(f"zones.{zone_code}.default_image_duration", 5000),
@@ -168,8 +274,10 @@ class MiddleStage(QWidget):
                 items,
                 zone_code=zone_code,
                 default_ms=default_ms,
+                start_index=start_index,
             )
         else:
+            self._clear_mixed_playlist(self.fullscreen_frame)
             self.fullscreen_frame.set_text(f"{zone_code}\n暂无播放内容")
 
         self.fullscreen_frame.show()
@@ -190,10 +298,13 @@ class MiddleStage(QWidget):
             return ms * 1000
         return ms
 
-    def _start_mixed_playlist(self, frame: MediaFrame, items: list, *, zone_code: str = None, default_ms: int = 5000):
-        """启动混合播放列表：图片+视频+文字按顺序循环"""
+    def _start_mixed_playlist(self, frame: MediaFrame, items, *, zone_code: str = None, default_ms: int = 5000,
+                              start_index: int = 0):
+        """启动混合播放列表：图片+视频+文字按顺序循环，从 start_index 开始"""
         if not items:
             logger.warning(f"[{frame.name}] 播放列表为空")
+            self._clear_mixed_playlist(frame)
+            frame.set_text(f"{zone_code or frame.name}\n暂无播放内容")
             return
         
         logger.info(f"[{frame.name}] 开始构建混合播放列表，共 {len(items)} 个项目")
@@ -212,6 +323,8 @@ class MiddleStage(QWidget):
                     playlist.append({
                         "type": "image",
                         "uri": uri,
+                        "renditions": item.get("renditions"),
+                        "source_uri": item.get("source_uri"),
                         "display_ms": display_ms,
                         "item_id": item_id
                     })
@@ -225,6 +338,8 @@ class MiddleStage(QWidget):
                     playlist.append({
                         "type": "video",
                         "uri": uri,
+                        "posters": item.get("posters"),
+                        "source_uri": item.get("source_uri"),
                         "item_id": item_id
                     })
                 else:
@@ -259,13 +374,18 @@ class MiddleStage(QWidget):
         
         if not playlist:
             logger.error(f"[{frame.name}] 没有有效的播放项")
+            # 旧列表的切换仍在时钟中，不清除会在提示文字上继续播放旧内容
+            self._clear_mixed_playlist(frame)
+            frame.set_text(f"{zone_code or frame.name}\n暂无有效播放内容")
             return
         
         logger.info(f"[{frame.name}] ✓ 构建完成，有效播放项: {len(playlist)}/{len(items)}")
         
         frame._mixed_playlist = playlist
-        frame._mixed_index = 0
-        self._play_mixed_item(frame, 0)
+        frame.zone_code = zone_code or ""
+        start_index = start_index if 0 <= start_index < len(playlist) else 0
+        frame._mixed_index = start_index
+        self._play_mixed_item(frame, start_index)
 
     def _play_mixed_item(self, frame: MediaFrame, index: int):
         """播放混合列表中的指定项"""
@@ -276,8 +396,10 @@ class MiddleStage(QWidget):
             index = 0
         
         frame._mixed_index = index
+        self._cancel_advance(frame)
         item = frame._mixed_playlist[index]
         item_type = item.get("type")
+        metrics.inc("viewer_transitions_total", zone=frame.zone_code or frame.name, kind=item_type)
         item_id = item.get("item_id")
         
         print(f"[{frame.name}] 播放第 {index+1}/{len(frame._mixed_playlist)} 项: {item_type} (ID: {item_id})")
@@ -291,42 +413,75 @@ class MiddleStage(QWidget):
         if item_type == "text":
             display_ms = item.get("display_ms", 5000)
             frame.set_text(item.get("text", ""), display_ms=display_ms)
-            QTimer.singleShot(display_ms, lambda: self._play_next_mixed_item(frame))
+            self._schedule_advance(frame, display_ms)
         
         elif item_type == "image":
             uri = item.get("uri")
             display_ms = item.get("display_ms", 5000)
-            frame.set_image(uri, cover=True, display_ms=display_ms)
-            QTimer.singleShot(display_ms, lambda: self._play_next_mixed_item(frame))
+            frame.set_image(uri, cover=True, display_ms=display_ms, renditions=item.get("renditions"),
+                            source=item.get("source_uri"))
+            self._schedule_advance(frame, display_ms)
         
         elif item_type == "video":
-            uri = item.get("uri")
-            try:
-                frame.player.mediaStatusChanged.disconnect()
-            except:
-                pass
-            frame.player.mediaStatusChanged.connect(
-                lambda status: self._on_video_status(frame, status)
-            )
-            frame.play_videos([uri], loop=False)
+            frame.play_video(item.get("uri"), posters=item.get("posters"), source=item.get("source_uri"))
         elif item_type == "countdown":
             display_ms = item.get("display_ms", 5000)
             text = self._format_countdown_text(item)
             frame.set_text(text, display_ms=display_ms)
-            QTimer.singleShot(display_ms, lambda: self._play_next_mixed_item(frame))
+            self._schedule_advance(frame, display_ms)
+
+        # 当前项展示期间预取后续项
+        self._prefetch_ahead(frame, index)
+
+    def _prefetch_ahead(self, frame: MediaFrame, index: int):
+        """
+        预取当前项之后的播放项：图片提前解码，视频提前预热文件
+        紧接着的视频在备用播放器中预载并停在首帧，以便无缝切换；
+        至少预取 prefetch_count 项；后续项展示时间较短时继续向后预取，
+        直到累计展示时间达到 prefetch_lead_ms（视频按时长未知，计为达到）
+        """
+        playlist = frame._mixed_playlist
+        total = len(playlist)
+        if total == 1:
+            # 单个视频循环播放：备用播放器预载同一视频，循环时也无黑场
+            if playlist[0].get("type") == "video":
+                frame.preload_video(playlist[0].get("uri"), source=playlist[0].get("source_uri"))
+            return
+
+        lead_ms = 0
+        for step in range(1, min(total - 1, self.prefetch_max) + 1):
+            if step > self.prefetch_count and lead_ms >= self.prefetch_lead_ms:
+                break
+            item = playlist[(index + step) % total]
+            item_type = item.get("type")
+            if item_type == "image":
+                frame.prefetch_image(item.get("uri"), cover=True, renditions=item.get("renditions"))
+                lead_ms += item.get("display_ms", 5000)
+            elif item_type == "video":
+                if step == 1:
+                    frame.preload_video(item.get("uri"), source=item.get("source_uri"))
+                else:
+                    frame.prefetch_video(item.get("uri"))
+                    # 未预载的视频切换时先显示封面帧
+                    frame.prefetch_poster(item.get("posters"))
+                lead_ms = max(lead_ms, self.prefetch_lead_ms)
+            else:
+                lead_ms += item.get("display_ms", 5000)
 
     def _play_next_mixed_item(self, frame: MediaFrame):
         """播放下一项"""
-        if not hasattr(frame, '_mixed_playlist'):
+        if not getattr(frame, '_mixed_playlist', None):
             return
         next_index = (frame._mixed_index + 1) % len(frame._mixed_playlist)
         self._play_mixed_item(frame, next_index)
 
-    def _on_video_status(self, frame: MediaFrame, status):
-        """视频状态变化回调"""
-        if status == QMediaPlayer.EndOfMedia:
-            print(f"[{frame.name}] 视频播放完成")
-            QTimer.singleShot(500, lambda: self._play_next_mixed_item(frame))
+    def _on_video_finished(self, frame: MediaFrame):
+        """视频播放完成：立即切到下一项（下一个视频已在备用播放器中预载）"""
+        playlist = getattr(frame, '_mixed_playlist', None)
+        if not playlist or playlist[frame._mixed_index].get("type") != "video":
+            return
+        print(f"[{frame.name}] 视频播放完成")
+        self._play_next_mixed_item(frame)
 
     def _format_countdown_text(self, item):
         """生成倒计时显示文本"""
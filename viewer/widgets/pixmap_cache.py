@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩放后图片的进程级缓存
+key = (路径, 修改时间, 目标宽, 目标高, cover)，按字节预算 LRU 淘汰，所有区域共用
+"""
+
+import os
+import sys
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QPixmap
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logger_config import get_logger
+from config_manager import config
+from .image_loader import get_io_pool
+
+logger = get_logger()
+
+
+class _StatSignals(QObject):
+    finished = pyqtSignal(str, float)
+
+
+class _StatTask(QRunnable):
+    """在线程池中读取文件修改时间（NAS 上 stat 可能较慢）"""
+
+    def __init__(self, path: str, signals: _StatSignals):
+        super().__init__()
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = -1.0
+        self.signals.finished.emit(self.path, mtime)
+
+
+class PixmapCache(QObject):
+    """
+    缩放后 QPixmap 的 LRU 缓存（仅在 GUI 线程使用）
+    文件修改时间由解码任务带回；revalidate 可在后台重新 stat，文件变化时丢弃旧条目
+    """
+
+    def __init__(self, budget_bytes: int, io_pool: QThreadPool, parent=None):
+        super().__init__(parent)
+        self.budget_bytes = max(0, int(budget_bytes))
+        # stat 任务放在 IO 线程池，不占用解码线程
+        self._io_pool = io_pool
+        self._entries = OrderedDict()
+        self._mtimes = {}
+        # 路径 -> 缓存条目数；最后一个条目被淘汰时同时丢弃其修改时间
+        self._counts = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stat_signals = _StatSignals(self)
+        self._stat_signals.finished.connect(self._on_stat)
+
+    @staticmethod
+    def _cost(pm: QPixmap) -> int:
+        return pm.width() * pm.height() * max(1, pm.depth()) // 8
+
+    def _key(self, path, width, height, cover):
+        mtime = self._mtimes.get(path)
+        if mtime is None:
+            return None
+        return (path, mtime, int(width), int(height), bool(cover))
+
+    def get(self, path: str, width: int, height: int, cover: bool):
+        """查找缓存，命中时返回 QPixmap 并移到最近使用，否则返回 None"""
+        key = self._key(path, width, height, cover)
+        pm = self._entries.get(key) if key else None
+        if pm is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return pm
+
+    def contains(self, path: str, width: int, height: int, cover: bool) -> bool:
+        """是否已缓存（不计入命中统计）"""
+        key = self._key(path, width, height, cover)
+        return key is not None and key in self._entries
+
+    def put(self, path: str, mtime: float, width: int, height: int, cover: bool, pm: QPixmap):
+        """写入缓存，超出预算时淘汰最久未用的条目"""
+        if pm is None or pm.isNull():
+            return
+        if self._mtimes.get(path) not in (None, mtime):
+            self.invalidate(path)
+
+        cost = self._cost(pm)
+        if cost > self.budget_bytes:
+            return
+        self._mtimes[path] = mtime
+        key = (path, mtime, int(width), int(height), bool(cover))
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= self._cost(old)
+        else:
+            self._counts[path] = self._counts.get(path, 0) + 1
+        self._entries[key] = pm
+        self._bytes += cost
+        while self._bytes > self.budget_bytes and self._entries:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._cost(evicted)
+            self.evictions += 1
+            self._forget_entry(evicted_key[0])
+
+    def _forget_entry(self, path: str):
+        """某个文件少了一个条目；没有条目时不再记录其修改时间（revalidate 也随之跳过）"""
+        remaining = self._counts.get(path, 0) - 1
+        if remaining > 0:
+            self._counts[path] = remaining
+        else:
+            self._counts.pop(path, None)
+            self._mtimes.pop(path, None)
+
+    def invalidate(self, path: str):
+        """丢弃某个文件的全部缓存"""
+        for key in [k for k in self._entries if k[0] == path]:
+            self._bytes -= self._cost(self._entries.pop(key))
+        self._mtimes.pop(path, None)
+        self._counts.pop(path, None)
+
+    def revalidate(self, path: str):
+        """后台重新读取文件修改时间，变化时丢弃旧缓存"""
+        if path in self._mtimes:
+            self._io_pool.start(_StatTask(path, self._stat_signals))
+
+    def _on_stat(self, path, mtime):
+        known = self._mtimes.get(path)
+        if known is not None and known != mtime:
+            logger.info(f"图片文件已变化，丢弃缓存: {path}")
+            self.invalidate(path)
+
+    def clear(self):
+        self._entries.clear()
+        self._mtimes.clear()
+        self._counts.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        """缓存统计"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+_cache = None
+
+
+def get_pixmap_cache() -> PixmapCache:
+    """获取进程级缓存实例（预算取自 performance.image_cache_mb）"""
+    global _cache
+    if _cache is None:
+        budget_mb = config.get("performance.image_cache_mb", 256)
+        _cache = PixmapCache(int(budget_mb) * 1024 * 1024, get_io_pool())
+        logger.info(f"图片缓存预算: {budget_mb} MB")
+    return _cache
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+播放时钟
+所有区域的切换截止时间放在同一个最小堆中，只用一个 QTimer 等待最早的截止时间，
+每次调度返回 token，可随时取消
+"""
+
+import heapq
+import itertools
+import os
+import sys
+import time
+from PyQt5.QtCore import QObject, QTimer, Qt
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logger_config import get_logger
+from metrics import metrics
+
+logger = get_logger()
+
+
+class PlaybackClock(QObject):
+    """
+    单调时钟 + 截止时间优先队列
+    - schedule / schedule_at 返回 token，cancel(token) 后回调不会再被调用
+    - 回调执行期间 firing_deadline 为本次的截止时间，用于衔接下一次调度、避免误差累积
+    - speed 为时间倍率（浸泡测试用于加速播放，正常运行为 1）
+    """
+
+    def __init__(self, parent=None, speed: float = 1.0):
+        super().__init__(parent)
+        self.speed = max(1e-3, float(speed))
+        self._heap = []
+        self._callbacks = {}
+        self._tokens = itertools.count(1)
+        self.firing_deadline = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_timeout)
+
+    @staticmethod
+    def now() -> float:
+        """单调时钟（毫秒）"""
+        return time.monotonic() * 1000.0
+
+    def schedule(self, delay_ms, callback) -> int:
+        """delay_ms 毫秒后调用 callback；在回调中调用时从本次截止时间起算"""
+        now = self.now()
+        base = self.firing_deadline if self.firing_deadline is not None else now
+        return self.schedule_at(max(now, base + max(0, delay_ms) / self.speed), callback)
+
+    def schedule_at(self, deadline_ms: float, callback) -> int:
+        """在单调时钟到达 deadline_ms 时调用 callback"""
+        token = next(self._tokens)
+        self._callbacks[token] = callback
+        heapq.heappush(self._heap, (deadline_ms, token))
+        if self._heap[0][1] == token:
+            self._arm()
+        return token
+
+    def cancel(self, token):
+        """取消调度（token 为 None 或已执行时忽略）"""
+        if token is None or self._callbacks.pop(token, None) is None:
+            return
+        # 已取消的条目留在堆中，出堆时跳过；过多时整理一次
+        if len(self._heap) > 2 * len(self._callbacks) + 32:
+            self._heap = [e for e in self._heap if e[1] in self._callbacks]
+            heapq.heapify(self._heap)
+            self._arm()
+
+    def pending(self) -> int:
+        """待执行的回调数量"""
+        return len(self._callbacks)
+
+    def queued(self) -> int:
+        """堆中的条目数量（含尚未清理的已取消条目）"""
+        return len(self._heap)
+
+    def _arm(self):
+        while self._heap and self._heap[0][1] not in self._callbacks:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            self._timer.stop()
+            return
+        delay = self._heap[0][0] - self.now()
+        self._timer.start(max(0, int(delay + 0.999)))
+
+    def _on_timeout(self):
+        now = self.now()
+        while self._heap and self._heap[0][0] <= now:
+            deadline, token = heapq.heappop(self._heap)
+            callback = self._callbacks.pop(token, None)
+            if callback is None:
+                continue
+            metrics.observe("viewer_advance_lateness_seconds", max(0.0, now - deadline) / 1000.0)
+            self.firing_deadline = deadline
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"播放时钟回调异常: {e}", exc_info=True)
+            finally:
+                self.firing_deadline = None
+        self._arm()